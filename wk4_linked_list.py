@@ -18,28 +18,102 @@ of the entire list. The head/tail of individual nodes are described as the
 node's 'item' and 'next'.
 
 The four functions we were asked to add (here named add(), remove(), size() and
-search()) all rely on traversal of the list. For this reason, add, size and
-search have an worst-case complexity of O(n). The remove function has to 
-traverse the list up to 3 times (to select nodes either side of the target, so
-they can be linked) and so has a worst case scenario approaching O(3n). Removing
-the head node works in constant time, as only the head of the list is 
-referenced. Removing the tail node only recquires traversing the list twice, so
-has a complexity of O(2n). 
+search()) originally all relied on traversal of the list. Adding an item walked
+to the final node every time, so building a list of n items cost O(n^2), and
+size() was a recursive function that crashed with a RecursionError on lists
+longer than about 1000 items.
+
+The list now keeps a reference to its final node (self.tail) and a count of its
+nodes (self.length), which add() and remove() keep up to date. This makes add(),
+final_node() and size() all O(1), and building a list of n items O(n). extend()
+adds every item of an iterable, and from_iterable() makes a new list from one.
+
+search() still has a worst-case complexity of O(n), as it has to check each node
+in turn. The remove function used to traverse the list up to 4 times (once to
+count it, then to select the nodes either side of the target, so they could be
+linked). It now walks once, to the node before the target, as that node's next
+is the target and the target's next is the node after it. This is O(n) in the
+worst case. Removing the head node works in constant time, as only the head of
+the list is referenced.
+
+A singly linked node only knows the node after it, so removing a node always
+means finding the one before it first. DoublyLinkedList gives each node a
+reference to the node before it as well (node.prev). Given a node (as returned
+by add() or search_node()), remove_node() can unlink it in O(1), with no
+traversal at all. This suits queues and caches, which need to take items out of
+the middle of the list.
+
+Made with indexed=True, a list also keeps a dictionary (self.index) from each
+item to the set of nodes holding it (a set, as the same item can be added more
+than once). add() and remove() keep it up to date. contains() and search_node()
+then take O(1) on average instead of O(n). The cost is memory: a dictionary
+entry and a set for every distinct item, which is more than the nodes themselves
+take, and every item has to be hashable.
+
+The index holds nodes, not positions (every position after an insert or a
+removal would change), so two things stay O(n) on an indexed LinkedList:
+- search() reports a missing item in O(1), returning None without printing,
+  but for an item that is there it still walks from the head to count the
+  item's position, so a hit is O(position).
+- remove_item() finds a node holding the item in O(1), but a singly linked
+  node doesn't know the node before it, so unlinking it still walks to that
+  node, in O(position). On a DoublyLinkedList, which does know it,
+  remove_item() is O(1) on average.
+
+Finding the node at a position is still O(n), so a loop that calls
+at_location() for every position is O(n^2). SkipLinkedList is an 'indexable
+skip list'. As well as the normal links from each node to the next, some nodes
+have extra links that skip ahead over several nodes (like an express train that
+only stops at some stations). Each node gets a random number of levels: every
+node is on level 0, about half are also on level 1, a quarter on level 2, and
+so on. Every link also records how many nodes it skips over (its 'width'), so
+the position of each node can be worked out as the links are followed.
+at_location(), insert() and remove() follow the highest links that don't go
+past the position wanted, then drop down a level, which takes O(log n) steps
+on average. It has the same methods as LinkedList, so code that uses a
+LinkedList only needs to make a SkipLinkedList instead.
+
+Every item in these lists has a Node object of its own, which costs around 100
+bytes per item, and following node.next from one object to the next jumps
+around memory. UnrolledLinkedList is an 'unrolled' linked list: each node holds
+a Python list of up to 'capacity' items (64 by default), rather than one item.
+A node that fills up is split in two, and a node that falls below half full is
+merged with (or borrows items from) the node after it. This needs one node per
+few dozen items, so it takes a fraction of the memory, and iterating over it or
+adding items in bulk works a whole node's list at a time. As there is no node
+for each item, get() returns the item at a position rather than a node.
+
+None of the lists above are safe to use from several threads at once.
+ConcurrentQueue is a first-in-first-out queue, built from the same Nodes, that
+is safe to share between threads. It uses the 'two-lock' design of Michael and Scott: one lock for the head,
+held while an item is taken off, and another for the tail, held while an item
+is added. The list always starts with a 'dummy' node, so the head and tail are
+never the same real node, and a producer adding to the tail never has to wait
+for a consumer taking from the head. Both take O(1). get() can wait until
+there is an item, for as long as it is told to, and put_many() and get_many()
+move several items for a single lock.
 
 Traversal in these functions is realised either by placing a series of 
 if -statements inside a while-true loop, or else by calling to another function 
-(ie self.final_node, self.at_location) that implements its own traversal based 
-on the same principle. Size is implemented as a recursive function that passes 
-the current count of nodes onto another version of itself via argument. 
+(ie self.at_location) that implements its own traversal based on the same
+principle.
 
-As traversal is so central to the methods, I considered implementing an __iter__
-method for the LinkedList class. However, I decided that the extra processing 
-power needed for a method call wasn't adequately made up for by the ability to
-use "list.iter()" instead of "node = node.next". 
+I originally decided against an __iter__ method, as the extra processing power
+needed for a method call didn't seem to be made up for by the ability to write
+"for item in list" instead of "node = node.next". It has been added since, as
+a generator, because walking the list by hand in every caller is easy to get
+wrong, and a generator only costs one resumption per item.
 
 
 '''
 
+# imports
+import random  # chooses how many levels each node of a SkipLinkedList has
+import threading  # locks for ConcurrentQueue
+import time  # how long ConcurrentQueue.get() has left to wait
+from itertools import chain, islice  # work through UnrolledLinkedList a node's worth of items at a time
+from queue import Empty  # raised by ConcurrentQueue.get(), just as by queue.Queue.get()
+
 
 class Node:
     def __init__(self, item=None):
@@ -66,18 +140,48 @@ class Node:
 
 
 class LinkedList:
-    def __init__(self):
+    def __init__(self, indexed=False):
         self.head = None
+        # final node, and number of nodes, kept up to date by add() and remove()
+        self.tail = None
+        self.length = 0
+        # item: set of nodes holding it, if indexed
+        self.index = {} if indexed else None
 
-    def final_node(self):
-        node = self.head
-        while True:
-            if node == None:
-                return node
-            if node.is_tail():
-                return node
+    @classmethod
+    def from_iterable(cls, iterable, indexed=False):
+        """returns a new list holding the items of iterable, in order. O(n)"""
+        new_list = cls(indexed)
+        new_list.extend(iterable)
+        return new_list
+
+    def add_to_index(self, node):
+        if self.index != None:
+            nodes = self.index.get(node.item)
+            if nodes == None:
+                self.index[node.item] = {node}
             else:
-                node = node.next
+                nodes.add(node)
+
+    def remove_from_index(self, node):
+        if self.index != None:
+            nodes = self.index[node.item]
+            nodes.discard(node)
+            if not nodes:
+                del self.index[node.item]
+
+    def __iter__(self):
+        """yields each item in the list, from head to tail"""
+        node = self.head
+        while node != None:
+            yield node.item
+            node = node.next
+
+    def __len__(self):
+        return self.length
+
+    def final_node(self):
+        return self.tail
 
     def is_empty(self):
         if self.head == None:
@@ -102,51 +206,110 @@ class LinkedList:
                     return False
 
     def add(self, item):
+        """adds item to the end of the list, and returns its new node"""
         new_node = Node(item)
         if self.head == None:
             self.head = new_node
         else:
-            tail = self.final_node()
-            tail.next = new_node
+            self.tail.next = new_node
+        self.tail = new_node
+        self.length += 1
+        self.add_to_index(new_node)
+        return new_node
+
+    def insert(self, position, item):
+        """inserts item so that it ends up at position, and returns its new node. O(position)"""
+        if position == self.length:
+            return self.add(item)
+        if not 0 <= position < self.length:
+            print("no node at this location")
+            return False
+
+        new_node = Node(item)
+        if position == 0:
+            new_node.next = self.head
+            self.head = new_node
+        else:
+            pre_node = self.at_location(position-1)
+            new_node.next = pre_node.next
+            pre_node.next = new_node
+        self.length += 1
+        self.add_to_index(new_node)
+        return new_node
+
+    def extend(self, iterable):
+        """adds every item of iterable to the end of the list. O(k) for k items"""
+        tail = self.tail
+        added = 0
+        for item in iterable:
+            new_node = Node(item)
+            if tail == None:
+                self.head = new_node
+            else:
+                tail.next = new_node
+            tail = new_node
+            added += 1
+            self.add_to_index(new_node)
+        self.tail = tail
+        self.length += added
 
     def remove(self, position):
+        """removes the node at position, walking the list only once, to the node before it"""
         if position == 0:   # removes head node
             node = self.head
-            post_node = self.at_location(1)
-            self.head = post_node
-            del(node)
-
-        elif position == self.size() - 1:  # removes tail node
-            node = self.at_location(position)
-            pre_node = self.at_location(position-1)
-            pre_node.next = None
+            if node == None:
+                print("list is empty")
+                return False
+            self.head = node.next
+            if self.head == None:
+                self.tail = None
+            self.remove_from_index(node)
             del(node)
 
         else:  # removes other nodes
-            node = self.at_location(position)
             pre_node = self.at_location(position-1)
-            post_node = self.at_location(position+1)
+            if pre_node is False:
+                return False
+            node = pre_node.next
+            if node == None:
+                print("no node at this location")
+                return False
 
-            pre_node.next = post_node
+            pre_node.next = node.next
+            if node is self.tail:   # removes tail node
+                self.tail = pre_node
+            self.remove_from_index(node)
             del(node)
 
+        self.length -= 1
+
     def size(self, node="not specified", count=0,):
-        """returns size of list"""
+        """returns size of list, or count plus the number of nodes from node to the tail if node is given"""
         if node == "not specified":
-            node = self.head
-        if node == None:
-            return count
-        elif node.is_tail():
-            count += 1
-            return count
-        else:
+            return self.length
+        while node != None:
             count += 1
             node = node.next
-            count = self.size(node, count)
-            return count
+        return count
 
     def search(self, item, node="not specified", place=0):
-        "returns index of node containing searched for item"
+        """returns index of node containing searched for item.
+        With an index, a missing item returns None in O(1), without printing; an item that is there
+        still takes O(position), as the nodes before it have to be counted"""
+        if self.index != None:
+            nodes = self.index.get(item)
+            if not nodes:
+                return None
+            # the position still has to be counted, but each node is only checked against the set
+            if node == "not specified":
+                node = self.head
+            while node != None:
+                if node in nodes:
+                    return place
+                node = node.next
+                place += 1
+            return None
+
         while True:
             if node == "not specified":
                 node = self.head
@@ -159,6 +322,659 @@ class LinkedList:
                 node = node.next
                 place += 1
 
+    def search_node(self, item):
+        """returns a node containing item, or None, without printing on a miss.
+        Without an index this is the first such node; with one, it is any of them, found in O(1)"""
+        if self.index != None:
+            nodes = self.index.get(item)
+            return next(iter(nodes)) if nodes else None
+        node = self.head
+        while node != None:
+            if node.item == item:
+                return node
+            node = node.next
+        return None
+
+    def contains(self, item):
+        """returns True if item is in the list"""
+        if self.index != None:
+            return item in self.index
+        return self.search_node(item) != None
+
+    def __contains__(self, item):
+        return self.contains(item)
+
+    def remove_item(self, item):
+        """removes a node holding item and returns True, or returns False if there isn't one.
+        O(n) either way: with an index, the node is found (or found missing) in O(1), but a singly
+        linked list still has to walk to the node before it to unlink it. DoublyLinkedList does this in O(1)"""
+        target = self.search_node(item)
+        if target == None:
+            return False
+        if target is self.head:
+            self.remove(0)
+            return True
+        pre_node = self.head
+        while pre_node.next is not target:
+            pre_node = pre_node.next
+        pre_node.next = target.next
+        if target is self.tail:
+            self.tail = pre_node
+        self.remove_from_index(target)
+        self.length -= 1
+        return True
+
+
+class DoubleNode(Node):
+    def __init__(self, item=None):
+        super().__init__(item)
+        self.prev = None
+        # the list the node is in, so remove_node() can refuse nodes from other lists
+        self.owner = None
+
+
+class DoublyLinkedList(LinkedList):
+    """
+    A linked list whose nodes also point back to the node before them.
+
+    All of LinkedList's methods work the same way. The extra cost is one more
+    reference per node. In return, a node can be removed in O(1) with
+    remove_node(), and at_location() walks from whichever end is nearer.
+    """
+
+    def add(self, item):
+        """adds item to the end of the list, and returns its new node"""
+        new_node = DoubleNode(item)
+        new_node.owner = self
+        if self.head == None:
+            self.head = new_node
+        else:
+            self.tail.next = new_node
+            new_node.prev = self.tail
+        self.tail = new_node
+        self.length += 1
+        self.add_to_index(new_node)
+        return new_node
+
+    def extend(self, iterable):
+        """adds every item of iterable to the end of the list"""
+        for item in iterable:
+            self.add(item)
+
+    def insert(self, position, item):
+        """inserts item so that it ends up at position, walking from whichever end is nearer, and returns its new node"""
+        if position == self.length:
+            return self.add(item)
+        next_node = self.at_location(position) if 0 <= position < self.length else False
+        if next_node is False:
+            print("no node at this location")
+            return False
+
+        new_node = DoubleNode(item)
+        new_node.owner = self
+        new_node.next = next_node
+        new_node.prev = next_node.prev
+        if next_node.prev == None:
+            self.head = new_node
+        else:
+            next_node.prev.next = new_node
+        next_node.prev = new_node
+        self.length += 1
+        self.add_to_index(new_node)
+        return new_node
+
+    def at_location(self, int, node="not specified", count=0):
+        # walk back from the tail if it is nearer (only when starting from the head)
+        if node == "not specified" and count == 0 and self.length // 2 < int < self.length:
+            node = self.tail
+            for _ in range(self.length - 1 - int):
+                node = node.prev
+            return node
+        return super().at_location(int, node, count)
+
+    def remove_node(self, node):
+        """unlinks node (from add() or search_node()) from the list in O(1), and returns its item"""
+        if not isinstance(node, DoubleNode) or node.owner is not self:
+            raise ValueError("node is not in this list")
+
+        if node.prev == None:
+            self.head = node.next
+        else:
+            node.prev.next = node.next
+        if node.next == None:
+            self.tail = node.prev
+        else:
+            node.next.prev = node.prev
+
+        node.prev = node.next = node.owner = None
+        self.length -= 1
+        self.remove_from_index(node)
+        return node.item
+
+    def remove(self, position):
+        """removes the node at position, walking from whichever end is nearer"""
+        node = self.at_location(position)
+        if node is False:
+            return False
+        self.remove_node(node)
+
+    def remove_item(self, item):
+        """removes a node holding item in O(1) if the list is indexed (O(n) if not), returning True, or False if there isn't one"""
+        node = self.search_node(item)
+        if node == None:
+            return False
+        self.remove_node(node)
+        return True
+
+
+# most levels a SkipLinkedList node can have, enough for lists of about 2^32 items
+MAX_LEVEL = 32
+
+
+class SkipNode(Node):
+    def __init__(self, item=None, height=1):
+        super().__init__(item)
+        # links[level] is the next node on that level, and widths[level] how many places
+        # along the list it is. links[0] is always the same as next.
+        self.links = [None] * height
+        self.widths = [1] * height
+
+
+class SkipLinkedList(LinkedList):
+    """
+    A linked list with 'express lanes' (an indexable skip list), so that
+    at_location(), insert() and remove() take O(log n) steps on average,
+    rather than O(n).
+
+    A link that reaches the end of the list records the width to one place past
+    the final node, so the widths along any level always add up to the length of
+    the list plus one. The list starts with a header node, which isn't part of
+    the list and sits at position -1, and holds the first link on every level.
+
+    Level 0 is an ordinary linked list through node.next, so __iter__, search()
+    and size() work just as they do for LinkedList.
+    """
+
+    def __init__(self, indexed=False, seed=None):
+        self.header = SkipNode(None, MAX_LEVEL)
+        # number of levels in use, so searches don't start on levels that are empty
+        self.levels = 1
+        self.random = random.Random(seed)
+        super().__init__(indexed)
+
+    @property
+    def head(self):
+        return self.header.next
+
+    @head.setter
+    def head(self, node):
+        # only ever set to None, by LinkedList.__init__
+        self.header.next = self.header.links[0] = node
+
+    def random_height(self):
+        """returns 1 plus the number of 1 bits at the end of a random number, so each extra level is half as likely"""
+        bits = self.random.getrandbits(MAX_LEVEL - 1)
+        return min((bits ^ (bits + 1)).bit_length(), MAX_LEVEL)
+
+    def find_before(self, position):
+        """returns, for each level, the last node before position and that node's position"""
+        chain = [None] * self.levels
+        places = [0] * self.levels
+        node = self.header
+        place = -1
+        for level in range(self.levels - 1, -1, -1):
+            while node.links[level] != None and place + node.widths[level] < position:
+                place += node.widths[level]
+                node = node.links[level]
+            chain[level] = node
+            places[level] = place
+        return chain, places
+
+    def at_location(self, int, node="not specified", count=0):
+        if node != "not specified":
+            return super().at_location(int, node, count)
+        if self.is_empty():
+            print("list is empty")
+            return False
+        if not 0 <= int < self.length:
+            print("no node at this location")
+            return False
+
+        chain, places = self.find_before(int)
+        return chain[0].next
+
+    def insert(self, position, item):
+        """inserts item so that it ends up at position, and returns its new node. O(log n) on average"""
+        if not 0 <= position <= self.length:
+            print("no node at this location")
+            return False
+
+        height = self.random_height()
+        # the header's links on newly used levels reach the end of the list
+        for level in range(self.levels, height):
+            self.header.links[level] = None
+            self.header.widths[level] = self.length + 1
+        self.levels = max(self.levels, height)
+
+        chain, places = self.find_before(position)
+        new_node = SkipNode(item, height)
+        for level in range(self.levels):
+            pre_node = chain[level]
+            if level < height:
+                # the new node splits the link from pre_node in two
+                new_node.links[level] = pre_node.links[level]
+                new_node.widths[level] = places[level] + pre_node.widths[level] + 1 - position
+                pre_node.links[level] = new_node
+                pre_node.widths[level] = position - places[level]
+            else:
+                # the link now passes over one more node
+                pre_node.widths[level] += 1
+
+        new_node.next = new_node.links[0]
+        chain[0].next = new_node
+        if new_node.next == None:
+            self.tail = new_node
+        self.length += 1
+        self.add_to_index(new_node)
+        return new_node
+
+    def add(self, item):
+        """adds item to the end of the list, and returns its new node. O(log n) on average"""
+        return self.insert(self.length, item)
+
+    def extend(self, iterable):
+        """adds every item of iterable to the end of the list, in O(1) per item on average.
+        The last node on each level is kept as it goes, and the links to the end of the list are only given their widths once all the items are in"""
+        chain, places = self.find_before(self.length)
+        for item in iterable:
+            height = self.random_height()
+            while self.levels < height:
+                chain.append(self.header)
+                places.append(-1)
+                self.header.links[self.levels] = None
+                self.levels += 1
+
+            new_node = SkipNode(item, height)
+            chain[0].next = new_node
+            for level in range(height):
+                chain[level].links[level] = new_node
+                chain[level].widths[level] = self.length - places[level]
+                chain[level] = new_node
+                places[level] = self.length
+
+            self.tail = new_node
+            self.length += 1
+            self.add_to_index(new_node)
+
+        for level in range(self.levels):
+            chain[level].widths[level] = self.length - places[level]
+
+    def remove(self, position):
+        """removes the node at position. O(log n) on average"""
+        if self.is_empty():
+            print("list is empty")
+            return False
+        if not 0 <= position < self.length:
+            print("no node at this location")
+            return False
+
+        chain, places = self.find_before(position)
+        node = chain[0].next
+        for level in range(self.levels):
+            pre_node = chain[level]
+            if level < len(node.links):
+                # join the links either side of the node
+                pre_node.links[level] = node.links[level]
+                pre_node.widths[level] += node.widths[level] - 1
+            else:
+                pre_node.widths[level] -= 1
+
+        chain[0].next = node.next
+        if node is self.tail:
+            self.tail = chain[0] if chain[0] is not self.header else None
+        self.length -= 1
+        self.remove_from_index(node)
+        del(node)
+
+    def remove_item(self, item):
+        """removes the first node holding item and returns True, or returns False if there isn't one. O(n), to find its position"""
+        position = self.search(item)
+        if position == None:
+            return False
+        self.remove(position)
+        return True
+
+
+# most items held by each node of an UnrolledLinkedList, unless told otherwise
+NODE_CAPACITY = 64
+
+
+class UnrolledNode:
+    def __init__(self, items=None):
+        self.items = [] if items is None else items
+        self.next = None
+
+
+class UnrolledLinkedList:
+    """
+    A linked list whose nodes each hold a list of up to 'capacity' items.
+
+    Every node except the last is kept at least half full, so finding a
+    position means skipping over whole nodes, which takes O(n / capacity)
+    steps, and inserting or removing shifts at most 'capacity' items within
+    one node.
+
+    The list holds items rather than nodes, so a stored item could be 0, "" or
+    False. Instead of printing and returning False, as LinkedList does, it
+    reports a bad position or a missing item the way a Python list does:
+    get(), insert() and remove() raise IndexError, and search() and
+    remove_item() raise ValueError.
+    """
+
+    def __init__(self, capacity=NODE_CAPACITY):
+        if capacity < 2:
+            raise ValueError("capacity must be at least 2")
+        self.capacity = capacity
+        self.head = None
+        self.tail = None
+        self.length = 0
+
+    @classmethod
+    def from_iterable(cls, iterable, capacity=NODE_CAPACITY):
+        new_list = cls(capacity)
+        new_list.extend(iterable)
+        return new_list
+
+    def node_lists(self):
+        """yields the list of items held by each node, from head to tail"""
+        node = self.head
+        while node != None:
+            yield node.items
+            node = node.next
+
+    def __iter__(self):
+        # chain steps through each node's list in C, so the Python code here only runs once per node
+        return chain.from_iterable(self.node_lists())
+
+    def __len__(self):
+        return self.length
+
+    def size(self):
+        return self.length
+
+    def is_empty(self):
+        return self.length == 0
+
+    def node_at(self, position):
+        """returns the node holding position, and the position's place in that node's list"""
+        node = self.head
+        while position >= len(node.items):
+            position -= len(node.items)
+            node = node.next
+        return node, position
+
+    def get(self, position):
+        """returns the item at position, or raises IndexError if there isn't one"""
+        if not 0 <= position < self.length:
+            raise IndexError("no item at this location")
+        node, offset = self.node_at(position)
+        return node.items[offset]
+
+    def add(self, item):
+        """adds item to the end of the list. O(1)"""
+        if self.tail == None or len(self.tail.items) >= self.capacity:
+            self.append_node(UnrolledNode())
+        self.tail.items.append(item)
+        self.length += 1
+
+    def append_node(self, node):
+        if self.tail == None:
+            self.head = node
+        else:
+            self.tail.next = node
+        self.tail = node
+
+    def extend(self, iterable):
+        """adds every item of iterable to the end of the list, a node's worth at a time"""
+        iterator = iter(iterable)
+        # top up the last node first
+        if self.tail != None and len(self.tail.items) < self.capacity:
+            before = len(self.tail.items)
+            self.tail.items.extend(islice(iterator, self.capacity - before))
+            self.length += len(self.tail.items) - before
+        while True:
+            items = list(islice(iterator, self.capacity))
+            if not items:
+                return
+            self.append_node(UnrolledNode(items))
+            self.length += len(items)
+
+    def insert(self, position, item):
+        """inserts item so that it ends up at position, splitting its node in two if it is full.
+        Raises IndexError if position is past the end of the list"""
+        if position == self.length:
+            return self.add(item)
+        if not 0 <= position < self.length:
+            raise IndexError("no item at this location")
+
+        node, offset = self.node_at(position)
+        node.items.insert(offset, item)
+        self.length += 1
+
+        if len(node.items) > self.capacity:
+            half = len(node.items) // 2
+            new_node = UnrolledNode(node.items[half:])
+            del node.items[half:]
+            new_node.next = node.next
+            node.next = new_node
+            if node is self.tail:
+                self.tail = new_node
+
+    def remove(self, position):
+        """removes the item at position, and returns it. Raises IndexError if there isn't one"""
+        if not 0 <= position < self.length:
+            raise IndexError("no item at this location")
+
+        # the node before is needed in case the node holding position ends up empty
+        pre_node = None
+        node = self.head
+        while position >= len(node.items):
+            position -= len(node.items)
+            pre_node = node
+            node = node.next
+
+        item = node.items.pop(position)
+        self.length -= 1
+        self.rebalance(pre_node, node)
+        return item
+
+    def rebalance(self, pre_node, node):
+        """keeps node at least half full after a removal, by merging it with the node after it, or taking items from it"""
+        if not node.items:
+            # unlink the empty node
+            if pre_node == None:
+                self.head = node.next
+            else:
+                pre_node.next = node.next
+            if node is self.tail:
+                self.tail = pre_node
+            return
+
+        post_node = node.next
+        if post_node == None or len(node.items) >= self.capacity // 2:
+            return
+        if len(node.items) + len(post_node.items) <= self.capacity:
+            node.items.extend(post_node.items)
+            node.next = post_node.next
+            if post_node is self.tail:
+                self.tail = node
+        else:
+            # take enough items from the next node to make both about equal
+            moved = (len(post_node.items) - len(node.items)) // 2
+            node.items.extend(post_node.items[:moved])
+            del post_node.items[:moved]
+
+    def search(self, item):
+        """returns index of the first item equal to item, or raises ValueError if there isn't one"""
+        place = 0
+        node = self.head
+        while node != None:
+            if item in node.items:
+                return place + node.items.index(item)
+            place += len(node.items)
+            node = node.next
+        raise ValueError(f"{item!r} is not in the list")
+
+    def contains(self, item):
+        node = self.head
+        while node != None:
+            if item in node.items:
+                return True
+            node = node.next
+        return False
+
+    def __contains__(self, item):
+        return self.contains(item)
+
+    def remove_item(self, item):
+        """removes the first item equal to item, or raises ValueError if there isn't one"""
+        pre_node = None
+        node = self.head
+        while node != None:
+            if item in node.items:
+                node.items.remove(item)
+                self.length -= 1
+                self.rebalance(pre_node, node)
+                return
+            pre_node = node
+            node = node.next
+        raise ValueError(f"{item!r} is not in the list")
+
+
+class ConcurrentQueue:
+    """
+    A thread-safe first-in-first-out queue, with separate locks for the head
+    and the tail, so that adding and taking items can happen at the same time.
+
+    get() raises queue.Empty when there is no item (after waiting, if it is
+    allowed to), just like queue.Queue.
+
+    A consumer waiting for an item waits on a condition of the head lock. So
+    that producers don't have to take the head lock on every put, consumers
+    count themselves in self.waiting before checking whether the queue is
+    empty, and a producer only takes the head lock to wake them if, after
+    adding its item, that count isn't zero. Either the producer sees the count,
+    or the consumer sees the item.
+    """
+
+    def __init__(self):
+        # the head is always a dummy node; the first item is in head.next
+        self.head = self.tail = Node()
+        self.head_lock = threading.Lock()
+        self.tail_lock = threading.Lock()
+        self.not_empty = threading.Condition(self.head_lock)
+        self.waiting = 0
+
+        # items added and taken so far, each only changed while holding its own lock
+        self.puts = 0
+        self.gets = 0
+
+    def qsize(self):
+        """returns roughly how many items are in the queue (other threads may be changing it)"""
+        return self.puts - self.gets
+
+    def __len__(self):
+        return self.qsize()
+
+    def empty(self):
+        return self.head.next == None
+
+    def link(self, first, last, count):
+        """adds the chain of nodes from first to last to the tail, then wakes up to count waiting consumers"""
+        with self.tail_lock:
+            self.tail.next = first
+            self.tail = last
+            self.puts += count
+        if self.waiting:
+            with self.head_lock:
+                self.not_empty.notify(count)
+
+    def put(self, item):
+        """adds item to the tail of the queue. O(1)"""
+        node = Node(item)
+        self.link(node, node, 1)
+
+    def put_many(self, items):
+        """adds every item of items to the tail of the queue, in order, taking the tail lock only once"""
+        first = last = None
+        count = 0
+        for item in items:
+            node = Node(item)
+            if first == None:
+                first = node
+            else:
+                last.next = node
+            last = node
+            count += 1
+        if count:
+            self.link(first, last, count)
+
+    def wait_for_item(self, block, timeout):
+        """waits until the queue has an item, raising Empty if it can't wait or runs out of time. Must hold the head lock"""
+        if self.head.next != None:
+            return
+        if not block:
+            raise Empty
+        deadline = None if timeout == None else time.monotonic() + timeout
+        self.waiting += 1
+        try:
+            while self.head.next == None:
+                if deadline == None:
+                    self.not_empty.wait()
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise Empty
+                    self.not_empty.wait(remaining)
+        finally:
+            self.waiting -= 1
+
+    def take(self):
+        """takes the first item off the queue. Must hold the head lock, and the queue mustn't be empty"""
+        node = self.head.next
+        item = node.item
+        # the node taken from becomes the new dummy node
+        node.item = None
+        self.head = node
+        self.gets += 1
+        return item
+
+    def get(self, block=True, timeout=None):
+        """
+        takes the item at the head of the queue. If the queue is empty and
+        block is True, waits for an item (for at most timeout seconds, if
+        given). Raises queue.Empty if there is no item to take.
+        """
+        with self.head_lock:
+            self.wait_for_item(block, timeout)
+            return self.take()
+
+    def get_nowait(self):
+        return self.get(False)
+
+    def get_many(self, max_items, block=True, timeout=None):
+        """
+        takes up to max_items from the head of the queue, taking the head lock
+        only once. Waits for the first item, as get() does, but not for any
+        after it.
+        """
+        with self.head_lock:
+            self.wait_for_item(block, timeout)
+            items = []
+            while len(items) < max_items and self.head.next != None:
+                items.append(self.take())
+            return items
+
 
 if __name__ == "__main__":
     ''' These are tests to check class functionality'''
@@ -0,0 +1,184 @@
+"""
+Benchmarks for wk4_linked_list.
+
+Running this file compares a plain LinkedList with one made with indexed=True, at sizes from 10^3 to 10^6 items. For each it reports:
+
+- how long building the list takes, and how much memory the list takes (measured with tracemalloc)
+- how long a lookup (contains()) takes, on average, for items that are in the list and for items that aren't
+
+The plain list's lookups are O(n), so only LOOKUPS of them are timed at each size; the indexed list's are O(1) on average.
+
+It then compares LinkedList with UnrolledLinkedList at the same sizes: how long building each takes (with extend()), how much memory each takes, and how long iterating over every item takes.
+
+Finally it measures how many items per second pass through a ConcurrentQueue, a queue.Queue and a collections.deque, with PRODUCERS threads putting QUEUE_ITEMS items in and CONSUMERS threads taking them out. ConcurrentQueue is measured both an item at a time and in batches of BATCH items (with put_many() and get_many()). A deque can't make a consumer wait for an item, so its consumers try again (after letting other threads run) whenever it is empty.
+
+The largest size, as a power of 10, can be given as the first argument:
+
+    python wk4_linked_list_benchmark.py 5
+"""
+
+# imports
+import queue  # queue.Queue, to compare ConcurrentQueue with
+import random  # chooses the items looked up
+import sys  # used to read the largest size from the command line
+import threading  # runs the producers and consumers
+import time  # lets a deque's consumers give way to other threads
+import tracemalloc  # measures the memory each list takes
+from collections import deque  # to compare ConcurrentQueue with
+
+from time_checking_funcs import timetaken
+from wk4_linked_list import ConcurrentQueue, LinkedList, UnrolledLinkedList
+
+# number of lookups timed at each size
+LOOKUPS = 100
+
+# threads and items used to measure the queues
+PRODUCERS = 4
+CONSUMERS = 4
+QUEUE_ITEMS = 200000
+BATCH = 100
+
+# put on a queue once for each consumer, to tell it to stop
+STOP = None
+
+
+def build(size, indexed=False, list_class=LinkedList):
+    """Builds a list of the numbers 0 to size-1, returning it, the time taken in seconds and the memory it takes in bytes."""
+    def make(items):
+        return list_class.from_iterable(items, indexed) if indexed else list_class.from_iterable(items)
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        linked_list = make(range(size))
+        memory = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+    # built a second time without tracemalloc, which slows Python down, for the timing
+    holder = []
+    seconds = timetaken(lambda items: holder.append(make(items)), range(size))
+    return holder.pop(), seconds, memory
+
+
+def time_lookups(linked_list, items):
+    """Returns the average time, in seconds, of linked_list.contains() for each of 'items'."""
+    seconds = timetaken(lambda lookups: [linked_list.contains(item) for item in lookups], items)
+    return seconds / len(items)
+
+
+def benchmark(size, seed=0):
+    """Returns the results for a plain and an indexed list of 'size' items, as a dictionary for each."""
+    generator = random.Random(seed)
+    present = [generator.randrange(size) for _ in range(LOOKUPS)]
+    absent = [size + item for item in present]
+
+    results = []
+    for indexed in (False, True):
+        linked_list, build_seconds, memory = build(size, indexed)
+        results.append({
+            "size": size,
+            "indexed": indexed,
+            "build_seconds": build_seconds,
+            "bytes_per_item": memory / size,
+            "hit_microseconds": time_lookups(linked_list, present) * 1000000,
+            "miss_microseconds": time_lookups(linked_list, absent) * 1000000,
+        })
+    return results
+
+
+def benchmark_unrolled(size):
+    """Returns the results for a LinkedList and an UnrolledLinkedList of 'size' items, as a dictionary for each."""
+    results = []
+    for list_class in (LinkedList, UnrolledLinkedList):
+        linked_list, build_seconds, memory = build(size, list_class=list_class)
+        results.append({
+            "size": size,
+            "class": list_class.__name__,
+            "build_seconds": build_seconds,
+            "bytes_per_item": memory / size,
+            "iterate_seconds": timetaken(sum, linked_list),
+        })
+    return results
+
+
+def deque_get(items):
+    """takes an item from a deque, giving way to other threads until there is one"""
+    while True:
+        try:
+            return items.popleft()
+        except IndexError:
+            time.sleep(0)
+
+
+# for each way of using a queue: making it, putting a batch of items in, and taking a batch out
+QUEUE_KINDS = {
+    "ConcurrentQueue": (ConcurrentQueue, lambda q, batch: [q.put(item) for item in batch], lambda q: [q.get()]),
+    "ConcurrentQueue batched": (ConcurrentQueue, ConcurrentQueue.put_many, lambda q: q.get_many(BATCH)),
+    "queue.Queue": (queue.Queue, lambda q, batch: [q.put(item) for item in batch], lambda q: [q.get()]),
+    "collections.deque": (deque, lambda q, batch: [q.append(item) for item in batch], lambda q: [deque_get(q)]),
+}
+
+
+def benchmark_queue(kind, items=QUEUE_ITEMS, producers=PRODUCERS, consumers=CONSUMERS):
+    """Returns how many items per second pass through a queue of the given kind, with producer and consumer threads running at once."""
+    make, put_batch, get_batch = QUEUE_KINDS[kind]
+    shared = make()
+    received = [0] * consumers
+
+    def produce(count):
+        for start in range(0, count, BATCH):
+            put_batch(shared, range(start, min(start + BATCH, count)))
+
+    def consume(number):
+        while True:
+            batch = get_batch(shared)
+            if STOP in batch:
+                received[number] += batch.index(STOP)
+                # a batch can take more than one consumer's STOP; pass the others on
+                extra = batch[batch.index(STOP) + 1:]
+                if extra:
+                    put_batch(shared, extra)
+                return
+            received[number] += len(batch)
+
+    def run(_):
+        workers = [threading.Thread(target=consume, args=(number,)) for number in range(consumers)]
+        producing = [threading.Thread(target=produce, args=(items // producers,)) for _ in range(producers)]
+        for thread in workers + producing:
+            thread.start()
+        for thread in producing:
+            thread.join()
+        put_batch(shared, [STOP] * consumers)
+        for thread in workers:
+            thread.join()
+
+    seconds = timetaken(run, None)
+    total = items // producers * producers
+    if sum(received) != total:
+        raise AssertionError(f"{kind}: {sum(received)} items received, {total} sent")
+    return {"kind": kind, "items": total, "seconds": seconds, "items_per_second": total / seconds}
+
+
+if __name__ == "__main__":
+
+    largest = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+
+    print(f"{'size':>9} {'index':>6} {'build s':>9} {'bytes/item':>11} {'hit us':>10} {'miss us':>10}")
+    for power in range(3, largest + 1):
+        for result in benchmark(10 ** power):
+            print(
+                f"{result['size']:>9} {str(result['indexed']):>6} {result['build_seconds']:>9.3f} "
+                f"{result['bytes_per_item']:>11.1f} {result['hit_microseconds']:>10.2f} {result['miss_microseconds']:>10.2f}")
+
+    print(f"\n{'size':>9} {'class':>19} {'build s':>9} {'bytes/item':>11} {'iterate s':>10}")
+    for power in range(3, largest + 1):
+        for result in benchmark_unrolled(10 ** power):
+            print(
+                f"{result['size']:>9} {result['class']:>19} {result['build_seconds']:>9.3f} "
+                f"{result['bytes_per_item']:>11.1f} {result['iterate_seconds']:>10.3f}")
+
+    print(f"\n{PRODUCERS} producers, {CONSUMERS} consumers, {QUEUE_ITEMS} items")
+    for kind in QUEUE_KINDS:
+        result = benchmark_queue(kind)
+        print(f"{kind:>24}: {result['items_per_second']:>10.0f} items/s")
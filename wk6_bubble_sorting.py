@@ -1,3 +1,32 @@
+# imports
+import sys  # write() writes to the screen through sys.stdout
+
+# number of lines write() joins together before each write
+WRITE_BLOCK = 4096
+
+
+def read_rows(stream):
+    """Yields a (label, value) pair for each line of 'label: value' in stream.
+    The value is everything after the last ': ' on the line, and must be a
+    whole number. Lines without a ': ' are skipped."""
+    for line in stream:
+        label, separator, value = line.rstrip("\n").rpartition(": ")
+        if separator:
+            yield label, int(value)
+
+
+def write_rows(rows, stream, lines_per_write=WRITE_BLOCK):
+    """Writes each (label, value) pair in rows to stream as a line of
+    'label: value', joining the lines into blocks of lines_per_write."""
+    block = []
+    for label, value in rows:
+        block.append(f"{label}: {value}\n")
+        if len(block) >= lines_per_write:
+            stream.write("".join(block))
+            block.clear()
+    stream.write("".join(block))
+
+
 class LinkedList:
     """This class was provided with only an __init__ method. I was tasked with
     adding a sort function.
@@ -9,25 +38,74 @@ class LinkedList:
 
     The print() function was also modelled on the recursive __init__ function 
     that was provided. 
+
+    The recursive __init__, bubble() and print() copied data[1:] at every node
+    (O(n^2) time and memory to build a list), and couldn't handle more than
+    about 1000 rows before hitting Python's recursion limit. They now walk the
+    list with a loop instead. from_iterable() builds a list from any iterable
+    of (label, value) pairs, such as a generator reading a file, in O(n).
+    write() sends the list to a file (or the screen) a block of lines at a
+    time, rather than one print() call per node, and read() loads a file that
+    write() made.
+
+    Bubble sort takes O(n^2) comparisons, which is fine for the 240 countries
+    below, but far too slow for 100,000 rows. merge_sort() is a merge sort,
+    which takes O(n log n), and doesn't need indexing either. It doesn't swap
+    labels and values between nodes; it changes which node each node's tail
+    points to ('relinking'), so it needs no extra nodes. bubble_sort() is kept,
+    to compare the two.
     """
 
     def __init__(self, data):
-        self.label = data[0][0]
-        self.value = data[0][1]
-        self.tail = None if (len(data) == 1) else LinkedList(data[1:])
+        rows = iter(data)
+        try:
+            self.label, self.value = next(rows)
+        except StopIteration:
+            raise ValueError("a LinkedList needs at least one row") from None
+        self.tail = None
+
+        # link a new node onto the end for each of the other rows
+        node = self
+        for label, value in rows:
+            node.tail = self.new_node(label, value)
+            node = node.tail
+
+    @classmethod
+    def new_node(cls, label, value):
+        """Makes a single node, without going through __init__."""
+        node = cls.__new__(cls)
+        node.label = label
+        node.value = value
+        node.tail = None
+        return node
+
+    @classmethod
+    def from_iterable(cls, rows):
+        """Builds a list from any iterable of (label, value) pairs, in O(n).
+        Raises ValueError if there are none, as a list always has at least one
+        node."""
+        return cls(rows)
+
+    @classmethod
+    def read(cls, stream):
+        """Builds a list from lines of 'label: value', as made by write(). The
+        value is everything after the last ': ' on the line, and must be a
+        whole number."""
+        return cls.from_iterable(read_rows(stream))
+
+    def __iter__(self):
+        """Yields each node's (label, value) pair, from this node to the end."""
+        node = self
+        while node != None:
+            yield node.label, node.value
+            node = node.tail
 
     def swap_with_next(self):
         """ Swaps the 'label' and 'value' attributes of two list nodes. This 
         swapping function is how the bubble() method rearranges node items.
         """
-        temp_data = [(self.tail.label, self.tail.value)]
-        temp = LinkedList(temp_data)
-
-        self.tail.label = self.label
-        self.tail.value = self.value
-
-        self.label = temp.label
-        self.value = temp.value
+        self.label, self.tail.label = self.tail.label, self.label
+        self.value, self.tail.value = self.tail.value, self.value
 
     def bubble(self, head, swap_count=0):
         """
@@ -39,32 +117,27 @@ class LinkedList:
         fully sorted. The function intereprets a pass through that has not
         recquired a swap (swap_count = 0) to mean that sorting is complete.
 
-        Traversal of the list is implemented using recursion, following
-        the same principles as the __init__ method of the LinkedList class that
-        was provided.
-
-        Seperating the bubble sort into seperate 'bubbles' is needed to avoid
-        causing 'exceeds recursion limit' errors on big lists.
+        Traversal of the list used to be implemented using recursion,
+        following the same principles as the __init__ method of the LinkedList
+        class that was provided. It is now a loop, so the length of the list is
+        no longer limited by the recursion limit.
 
         Each individual call to bubble has a complexity of O(n) as it cycles
         through the full length of the list once.
         """
 
-        # have we finished sorting?
-        if self.tail == None and swap_count == 0:
-            return False
+        node = self
+        while node.tail != None:
+            # do we need to swap with the next node?
+            if node.tail.value > node.value:
+                node.swap_with_next()
+                swap_count += 1
 
-        # have we finished this pass of the sorting process?
-        elif self.tail == None:
-            return True
+            # move on to next node
+            node = node.tail
 
-        # do we need to swap with the next node?
-        elif self.tail.value > self.value:
-            self.swap_with_next()
-            swap_count += 1
-
-        # move on to next node
-        return self.tail.bubble(head, swap_count)
+        # have we finished sorting? (only if this pass didn't need a swap)
+        return swap_count != 0
 
     def bubble_sort(self):
         """Continues calling the bubble() method until each node is sorted.
@@ -82,22 +155,184 @@ class LinkedList:
         while unsorted:
             unsorted = self.bubble(self)
 
+    def merge_sort(self, key=None, reverse=False):
+        """Sorts the list by value (or by key((label, value)), if a key function
+        is given), smallest first, or largest first if reverse is True. Like
+        Python's sorted(), it is stable: nodes with equal keys stay in the same
+        order as before.
+
+        The sort is 'bottom-up' and iterative, so it can't run out of
+        recursion, however long the list is. First the list is cut into 'runs'
+        that are already in order. A run in exactly the wrong order is reversed
+        (only if no two of its keys are equal, so that the sort stays stable).
+        Then neighbouring runs are merged in pairs, over and over, until one
+        run is left. Each round of merging halves the number of runs, and takes
+        O(n), so the sort takes O(n log r) for r runs, which is at most
+        O(n log n). A list that is already sorted (or reverse sorted) is a
+        single run, and takes O(n).
+
+        self stays the first node of the list, so anything holding the list
+        still holds all of it. To do this, once the nodes have been relinked,
+        self swaps places (and label and value) with whichever node ended up
+        first.
+        """
+        if key == None:
+            get_key = lambda node: node.value
+        else:
+            keys = {}
+            node = self
+            while node != None:
+                keys[node] = key((node.label, node.value))
+                node = node.tail
+            get_key = keys.__getitem__
+
+        # out_of_order(first, second) is True if second should come before first
+        if reverse:
+            out_of_order = lambda first, second: get_key(second) > get_key(first)
+        else:
+            out_of_order = lambda first, second: get_key(second) < get_key(first)
+
+        runs = self.find_runs(out_of_order)
+
+        # merge neighbouring runs, in pairs, until only one is left
+        while len(runs) > 1:
+            merged = [
+                self.merge_runs(runs[place], runs[place + 1], out_of_order)
+                for place in range(0, len(runs) - 1, 2)]
+            if len(runs) % 2:
+                merged.append(runs[-1])
+            runs = merged
+
+        first = runs[0][0]
+        if first is not self:
+            self.take_first_place(first)
+
+    def find_runs(self, out_of_order):
+        """Cuts the list into runs that are already in order (or in exactly the
+        wrong order, which are reversed), and returns them as a list of
+        (first node, last node) pairs. Each run's last node has its tail set
+        to None."""
+        runs = []
+        node = self
+        while node != None:
+            first = node
+            if node.tail != None and out_of_order(node, node.tail):
+                # a run in the wrong order: reverse each link as it goes
+                previous = None
+                while True:
+                    following = node.tail
+                    node.tail = previous
+                    previous = node
+                    if following == None or not out_of_order(node, following):
+                        break
+                    node = following
+                runs.append((node, first))
+                node = following
+            else:
+                while node.tail != None and not out_of_order(node, node.tail):
+                    node = node.tail
+                following = node.tail
+                node.tail = None
+                runs.append((first, node))
+                node = following
+        return runs
+
+    @staticmethod
+    def merge_runs(left, right, out_of_order):
+        """Merges two runs (as (first node, last node) pairs, with left's nodes
+        coming first in the list) into one, returning its first and last node.
+        A node from right only goes before a node from left if out_of_order
+        says it must, which keeps the sort stable."""
+        left_node, right_node = left[0], right[0]
+
+        # pick the first node of the merged run
+        if out_of_order(left_node, right_node):
+            first = last = right_node
+            right_node = right_node.tail
+        else:
+            first = last = left_node
+            left_node = left_node.tail
+
+        # then keep linking on whichever node comes next
+        while left_node != None and right_node != None:
+            if out_of_order(left_node, right_node):
+                last.tail = right_node
+                last = right_node
+                right_node = right_node.tail
+            else:
+                last.tail = left_node
+                last = left_node
+                left_node = left_node.tail
+
+        # whatever is left of one run is already in order
+        if left_node != None:
+            last.tail = left_node
+            last = left[1]
+        else:
+            last.tail = right_node
+            last = right[1]
+        return first, last
+
+    def take_first_place(self, first):
+        """Swaps this node with 'first', the node at the front of the list
+        after merge_sort() relinked it, so this node is at the front instead.
+        The two nodes swap labels and values too, so the order of the list
+        doesn't change."""
+        before_self = first
+        while before_self.tail is not self:
+            before_self = before_self.tail
+
+        if before_self is first:
+            # self is second: first, self, rest -> self, first, rest
+            first.tail = self.tail
+            self.tail = first
+        else:
+            # first, a, ..., before_self, self, rest -> self, a, ..., before_self, first, rest
+            self.tail, first.tail = first.tail, self.tail
+            before_self.tail = first
+
+        self.label, first.label = first.label, self.label
+        self.value, first.value = first.value, self.value
+
     def print(self):
-        """Prints the current node and then calls itself on the next node of 
-        the list."""
-        print(f"{self.label}: {self.value}")
-        if self.tail != None:
-            self.tail.print()
+        """Prints every node of the list, from this one to the end."""
+        self.write()
+
+    def write(self, stream=None, lines_per_write=WRITE_BLOCK):
+        """Writes each node as a line of 'label: value' to stream (the screen,
+        if no stream is given). The lines are joined into blocks of
+        lines_per_write, and each block is written in one go, which is much
+        quicker than a call to print() for every line."""
+        if stream == None:
+            stream = sys.stdout
+        write_rows(self, stream, lines_per_write)
 
 
 countries = LinkedList([
     ("Ukraine", 41879904), ("Brunei", 442400), ("Christmas Island (Australia)", 1928), ("Mauritius", 1265985), ("Lesotho", 2007201), ("Guatemala", 16604026), ("British Virgin Islands (UK)", 30030), ("Malta", 493559), ("Greenland (Denmark)", 56081), ("Guernsey (UK)", 62792), ("Ethiopia", 98665000), ("Suriname", 581372), ("Turkmenistan", 6031187), ("American Samoa (US)", 56700), ("French Polynesia (France)", 275918), ("Equatorial Guinea", 1358276), ("Solomon Islands", 680806), ("Burundi", 10953317), ("Abkhazia", 244832), ("Rwanda", 12374397), ("Iceland", 364260), ("Monaco", 38300), ("Namibia", 2458936), ("United States", 329532925), ("Brazil", 211402908), ("Finland", 5527573), ("Armenia", 2957500), ("Wallis and Futuna (France)", 11700), ("Cuba", 11209628), ("Guyana", 782766), ("Oman", 4664790), ("Aruba (Netherlands)", 112309), ("Nauru", 11000), ("Sri Lanka", 21803000), ("Myanmar", 54339766), ("United Arab Emirates", 9890400), ("Hungary", 9772756), ("Norfolk Island (Australia)", 1756), ("Cambodia", 15288489), ("Fiji", 884887), ("Benin", 11733059), ("Egypt", 100264508), ("Northern Cyprus", 351965), ("Angola", 31127674), ("Barbados", 287025), ("Trinidad and Tobago", 1363985), ("Colombia", 49395678), ("Turks and Caicos Islands (UK)", 41369), ("Norway", 5367580), ("Kiribati", 120100), ("Kosovo", 1795666), ("Azerbaijan", 10067108), ("Romania", 19405156), ("Kyrgyzstan", 6533500), ("Peru", 32131400), ("Australia", 25680766), ("Faroe Islands (Denmark)", 52124), ("Turkey", 83154997), ("Georgia", 3723464), ("Singapore", 5703600), ("Eswatini", 1093238), ("Saint Vincent and the Grenadines", 110608), ("East Timor", 1387149), ("Tuvalu", 10200), ("Pakistan", 219313520), ("Bahrain", 1543300), ("Paraguay", 7152703), ("Jersey (UK)", 106800), ("Slovakia", 5456362), ("Mongolia", 3313049), ("Argentina", 44938712), ("Jordan", 10660256), ("Saint BarthÃ©lemy (France)", 9793), ("Andorra", 77543), ("Bangladesh", 168456310), ("Saint Martin (France)", 35746), ("FS Micronesia", 104468), ("South Sudan", 12778250), ("Artsakh", 148000), ("Slovenia", 2094060), ("Senegal", 16209125), ("Ivory Coast", 25823071), ("Syria", 17500657), ("Montserrat (UK)", 4989), ("Philippines", 108505959), ("Laos", 7123205), ("Gibraltar (UK)", 33701), ("Iran", 83371987), ("Bahamas", 385340), ("Mauritania", 4077347), ("Portugal", 10276617), ("Madagascar", 26251309), ("Malawi", 19129952), ("Central African Republic", 5496011), ("Saint Kitts and Nevis", 52823), ("Ghana", 30280811), ("Honduras", 9158345), ("Belarus", 9408400), ("India", 1361140893), ("Estonia", 1328360), ("Nicaragua", 6460411), ("Mali", 20250833), ("Zambia", 17885422), ("S\u00e3o Tom\u00e9 and Pr\u00edncipe", 201784), ("Cura\u00e7ao (Netherlands)", 158665), ("Jamaica", 2726667), ("Northern Mariana Islands (US)", 56200), ("Vanuatu", 304500), ("Kuwait", 4420110), ("Cameroon", 26545864), ("Netherlands", 17456281), ("Saudi Arabia", 34218169), ("Dominican Republic", 10358320), ("Japan", 125950000), ("Djibouti", 1078373), ("Antigua and Barbuda", 96453), ("Morocco", 35871167), ("Nigeria", 206139587), ("Iraq", 39127900), ("South Korea", 51780579), ("Pitcairn Islands (UK)", 50), ("US Virgin Islands (US)", 104578), ("Ireland", 4921500), ("Sierra Leone", 7901454), ("Cyprus", 875900), ("Palestine", 4976684), ("Luxembourg", 626108), ("Falkland Islands (UK)", 3198), ("France", 67076000), ("Bolivia", 11469896), ("Panama", 4218808), ("Seychelles", 97625), ("Guinea-Bissau", 1604528), ("Puerto Rico (US)", 3193694), ("Anguilla (UK)", 14869), ("Macau (China)", 679600), ("North Macedonia", 2077132), ("Saint Helena, Ascension", 5633), ("Sweden", 10338368), ("Kazakhstan", 18683712), ("China", 1402247960), ("Italy", 60238522), ("Israel", 9186750), ("Uzbekistan", 34131625), ("Guam (US)", 172400), ("Dominica", 71808), ("Malaysia", 32752760), ("New Zealand", 4978784), ("Cape Verde", 550483), ("Uruguay", 3518552), ("Belgium", 11524454), ("Kenya", 47564296), ("Saint Pierre and Miquelon (France)", 6008), ("Uganda", 40299300), ("Yemen", 29825968), ("Nepal", 29996478), ("Switzerland", 8603899), ("Sint Maarten (Netherlands)", 40614), ("Tonga", 100651), ("Algeria", 43000000), ("Haiti", 11577779), ("Zimbabwe", 15159624), ("North Korea", 25450000), ("Congo", 5518092), ("Belize", 408487), ("Czech Republic", 10693939), ("Poland", 38379000), ("San Marino", 33574), ("Tanzania", 55890747), ("Tokelau (NZ)", 1400), ("Saint Lucia", 178696), ("Cook Islands (NZ)", 15200), ("Mozambique", 30066648), ("Indonesia", 266911900), ("Grenada", 112003), ("Burkina Faso", 20870060), ("Western Sahara", 582463), ("New Caledonia (France)", 282200), ("Albania", 2845955), ("Greece", 10724599), ("Bosnia and Herzegovina", 3301000), ("Montenegro", 622359), ("Russia", 146745098), ("Samoa", 200874), ("Comoros", 873724), ("United Kingdom", 66435550), ("Taiwan", 23604265), ("Vatican City", 799), ("Austria", 8902600), ("Lebanon", 6825442), ("Latvia", 1906800), ("Mexico", 126577691), ("Venezuela", 32219521), ("Papua New Guinea", 8935000), ("Chad", 16244513), ("Canada", 37996639), ("Maldives", 374775), ("Denmark", 5822763), ("Tajikistan", 9127000), ("Isle of Man (UK)", 83314), ("Afghanistan", 32225560), ("Germany", 83149300), ("Vietnam", 96208984), ("Eritrea", 3497117), ("Spain", 47100396), ("Costa Rica", 5058007), ("Cayman Islands (UK)", 65813), ("Niger", 22314743), ("Liechtenstein", 38749), ("Gambia", 2347706), ("Hong Kong (China)", 7500700), ("Sudan", 42432665), ("Tunisia", 11722038), ("\u00c5land Islands (Finland)", 29885), ("DR Congo", 89561404), ("Bulgaria", 6951482), ("Liberia", 4475353), ("Botswana", 2338851), ("Palau", 17900), ("Niue (NZ)", 1520), ("Thailand", 66494417), ("South Africa", 58775022), ("Lithuania", 2793471), ("Gabon", 2172579), ("Libya", 6871287), ("Transnistria", 469000), ("Moldova", 2681735), ("South Ossetia", 53532), ("Guinea", 12218357), ("El Salvador", 6486201), ("Croatia", 4076246), ("Qatar", 2747282), ("Serbia", 6963764), ("Togo", 7538000), ("Ecuador", 17466864), ("Cocos (Keeling) Islands (Australia)", 538), ("Chile", 19107216), ("Bermuda (UK)", 64027), ("Somalia", 15893219), ("Bhutan", 741672), ("Marshall Islands", 55500)])
 
 
-print("UNSORTED LIST")
-countries.print()
-print("\n")
+if __name__ == "__main__":
+
+    print("UNSORTED LIST")
+    countries.print()
+    print("\n")
+
+    # keep an unsorted copy, to check merge_sort() against bubble_sort()
+    rows = []
+    node = countries
+    while node != None:
+        rows.append((node.label, node.value))
+        node = node.tail
+    merge_sorted = LinkedList(rows)
+
+    print("SORTED LIST")
+    countries.bubble_sort()
+    countries.print()
 
-print("SORTED LIST")
-countries.bubble_sort()
-countries.print()
+    # bubble_sort() puts the largest value first
+    merge_sorted.merge_sort(reverse=True)
+    node, other = countries, merge_sorted
+    while node != None and node.value == other.value:
+        node, other = node.tail, other.tail
+    print(f"\nmerge_sort() gives the same order: {node == None}")
@@ -0,0 +1,176 @@
+"""
+A columnar version of the (label, value) data in wk6_bubble_sorting, using NumPy.
+
+wk6_bubble_sorting.LinkedList keeps each (label, value) pair in a node of its own, so every question about the data ('which are the 10 biggest?', 'which are between 1 and 5 million?') means walking, and usually sorting, the whole list in Python.
+
+ColumnarTable keeps the data as two columns instead: all the labels in one NumPy array, and all the values in another (of 64 bit integers). NumPy works on a whole column at once, in compiled code, so:
+
+- argsort() returns the order that sorts the table, in O(n log n) but many times quicker than any sort written in Python. The order is kept, so asking again costs nothing, and top_k() or bottom_k() afterwards only need to slice it.
+- top_k() and bottom_k() use partition(), which finds the k'th biggest (or smallest) value in O(n), without sorting the rest, and then sort only the k rows chosen, in O(k log k). They give exactly the rows sorted() would put first, ties included.
+- between() picks out the rows whose values are in a range, with one comparison over the whole column.
+
+For the 240 countries these all take a few microseconds. A table isn't changed once it has been made; every query returns a new table (or an array of positions).
+
+Running this file times each query on the countries list.
+"""
+
+# imports
+import numpy
+
+from wk6_bubble_sorting import LinkedList
+
+
+def stable_argsort(values, reverse=False):
+    """
+    Returns the positions that sort 'values', keeping equal values in the order they were in, smallest first or largest first.
+
+    Sorting largest first by negating the values would overflow for the smallest int64, and reversing a stable sort would put equal values backwards. A stable sort of the reversed array, reversed again and turned back into positions of the original, keeps them in order.
+    """
+    if not reverse:
+        return numpy.argsort(values, kind="stable")
+    return len(values) - 1 - numpy.argsort(values[::-1], kind="stable")[::-1]
+
+
+class ColumnarTable:
+    """
+    (label, value) rows kept as two NumPy columns: self.labels (an array of objects, usually strings) and self.values (an array of int64).
+    """
+
+    def __init__(self, labels, values):
+        self.labels = numpy.asarray(labels, dtype=object)
+        self.values = numpy.asarray(values, dtype=numpy.int64)
+        if self.labels.shape != self.values.shape or self.values.ndim != 1:
+            raise ValueError("labels and values must be two columns of the same length")
+
+        # the orders that sort the values, smallest first (False) and largest first (True); each is worked out the first time it is needed
+        self.orders = {False: None, True: None}
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Makes a table from any iterable of (label, value) pairs."""
+        labels = []
+        values = []
+        for label, value in rows:
+            labels.append(label)
+            values.append(value)
+        return cls(labels, values)
+
+    @classmethod
+    def from_linked_list(cls, linked_list):
+        """Makes a table from a wk6_bubble_sorting.LinkedList, keeping the order of its nodes."""
+        return cls.from_rows(linked_list)
+
+    def to_linked_list(self):
+        """Returns the rows as a wk6_bubble_sorting.LinkedList. Raises ValueError for an empty table, as a LinkedList can't be empty."""
+        return LinkedList.from_iterable(self)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        """Yields each row as a (label, value) pair, with the value as a Python int."""
+        return zip(self.labels.tolist(), self.values.tolist())
+
+    def rows(self):
+        """Returns every row, as a list of (label, value) pairs."""
+        return list(self)
+
+    def take(self, positions):
+        """Returns a new table of the rows at 'positions' (an array of positions, or of True/False for each row), in that order."""
+        return ColumnarTable(self.labels[positions], self.values[positions])
+
+    def argsort(self, reverse=False):
+        """
+        Returns the positions of the rows in order of value, smallest first (or largest first, if reverse is True).
+
+        The sort is stable: rows with equal values stay in the order they are in the table, in both directions, as with sorted(). The order is kept for later calls, so it is returned as a read-only array.
+        """
+        if self.orders[reverse] is None:
+            order = stable_argsort(self.values, reverse)
+            order.flags.writeable = False
+            self.orders[reverse] = order
+
+        # a view of a read-only array can't be made writeable, so callers can't change the kept order
+        return self.orders[reverse].view()
+
+    def sorted(self, reverse=False):
+        """Returns a new table with the rows in order of value."""
+        return self.take(self.argsort(reverse))
+
+    def top_k(self, k):
+        """
+        Returns a new table of the k rows with the largest values, largest first. This is always the same as sorted(reverse=True) cut to k rows: rows with equal values are in table order, and if only some of several equal values fit, the ones earliest in the table are kept.
+
+        Takes O(n + k log k): numpy.partition() finds the k'th largest value without sorting anything else, and only the k rows chosen are then sorted. If the table has already been sorted largest first, the start of that order is used instead.
+        """
+        return self.take(self.first_k(k, reverse=True))
+
+    def bottom_k(self, k):
+        """Returns a new table of the k rows with the smallest values, smallest first, the same as sorted() cut to k rows. See top_k()."""
+        return self.take(self.first_k(k, reverse=False))
+
+    def first_k(self, k, reverse):
+        """Returns the positions of the first k rows of argsort(reverse), working out only as much of the order as it needs to."""
+        k = max(0, min(k, len(self.values)))
+        if k == 0:
+            return numpy.empty(0, dtype=numpy.intp)
+        if self.orders[reverse] is not None:
+            return self.orders[reverse][:k]
+
+        # the k'th value in sorted order: everything beyond it is chosen, and as many rows equal to it as are still needed
+        if reverse:
+            cut_off = numpy.partition(self.values, len(self.values) - k)[len(self.values) - k]
+            beyond = numpy.flatnonzero(self.values > cut_off)
+        else:
+            cut_off = numpy.partition(self.values, k - 1)[k - 1]
+            beyond = numpy.flatnonzero(self.values < cut_off)
+        equal = numpy.flatnonzero(self.values == cut_off)[:k - len(beyond)]
+
+        # put the chosen rows back in table order, so the stable sort keeps equal values in that order
+        chosen = numpy.sort(numpy.concatenate((beyond, equal)))
+        return chosen[stable_argsort(self.values[chosen], reverse)]
+
+    def between(self, low=None, high=None):
+        """Returns a new table of the rows with low <= value <= high, in the table's order. Either end can be left as None, for no limit."""
+        keep = numpy.ones(len(self.values), dtype=bool)
+        if low is not None:
+            keep &= self.values >= low
+        if high is not None:
+            keep &= self.values <= high
+        return self.take(keep)
+
+
+if __name__ == "__main__":
+    ''' Times each query on the countries list, and checks them against the linked list '''
+
+    import timeit
+
+    from wk6_bubble_sorting import countries
+
+    table = ColumnarTable.from_linked_list(countries)
+
+    # the linked list's own merge sort, to check the table against
+    expected = countries.from_iterable(countries)
+    expected.merge_sort(reverse=True)
+    assert table.sorted(reverse=True).rows() == list(expected)
+    assert table.to_linked_list().value == countries.value
+    assert table.top_k(10).rows() == ColumnarTable(table.labels, table.values).top_k(10).rows()
+
+    # each query is timed on a new table (which shares the same columns), so none of them can use an order kept from an earlier one
+    def fresh():
+        return ColumnarTable(table.labels, table.values)
+
+    queries = {
+        "argsort (largest first)": lambda: fresh().argsort(reverse=True),
+        "top 10": lambda: fresh().top_k(10),
+        "bottom 10": lambda: fresh().bottom_k(10),
+        "between 1 and 5 million": lambda: fresh().between(1000000, 5000000),
+    }
+    for name, query in queries.items():
+        repeats = 10000
+        seconds = timeit.timeit(query, number=repeats) / repeats
+        print(f"{name:>24}: {seconds * 1000000:.1f} microseconds")
+
+    print("\nTop 5:")
+    for label, value in table.top_k(5):
+        print(f"{label}: {value}")
@@ -0,0 +1,155 @@
+"""
+An external (out-of-core) sort, for files of (label, value) records too big to fit in memory.
+
+The records are read from a file of 'label: value' lines, the same format that wk6_bubble_sorting.LinkedList.write() makes and read() loads. The sort works in two stages:
+
+1) The input is read RUN_SIZE records at a time. Each batch (a 'run') is sorted in memory and written ('spilled') to a temporary file. Runs are sorted by a pool of worker processes, so several are sorted at once, one per processor core. At most 'workers' runs are handed to the pool before the oldest is finished, so no more than about (workers + 1) * run_size records are in memory at any time, however big the input is.
+
+2) The sorted runs are merged. heapq.merge() keeps one record from each run in a heap, and repeatedly takes the smallest, then reads the next record from that run. With k runs, each record costs O(log k), and only k records (plus file buffers) are in memory. Opening too many files at once can hit the operating system's limit, so if there are more than MAX_OPEN_RUNS runs, groups of them are first merged into bigger runs, and so on, until there are few enough to merge into the output.
+
+Sorting n records takes O(n log n) in all, and reads and writes the data 2 times (plus once per extra round of merging). The sort is stable: records with equal keys come out in the order they went in, as sorted() and heapq.merge() are both stable, and runs are merged in the order they were read.
+
+As with LinkedList.merge_sort(), records are sorted by value unless a key function is given (which is called with each (label, value) pair), and smallest first unless reverse is True. The key function is sent to the worker processes, so it has to be one that can be pickled, such as a module level function (like label_key below), not a lambda.
+
+From the command line:
+
+    python wk6_external_sort.py countries.txt sorted.txt --run-size 1000000 --reverse
+"""
+
+# imports
+import argparse  # reads the command line
+import heapq  # merges the sorted runs
+import os  # removes the temporary files, and counts the processor cores
+import sys  # used to exit with the right status
+import tempfile  # makes the temporary files for the runs
+from collections import deque  # the runs being sorted, oldest first
+from concurrent.futures import ProcessPoolExecutor  # sorts several runs at once
+from itertools import islice  # takes RUN_SIZE records at a time
+
+from wk6_bubble_sorting import read_rows, write_rows
+
+# number of records sorted in memory at a time
+RUN_SIZE = 1 << 20
+
+# most runs merged at once
+MAX_OPEN_RUNS = 64
+
+# size of the buffer of each file the runs are read from or written to
+FILE_BUFFER = 1 << 16
+
+
+def value_key(row):
+    """Sorts by value (the default)."""
+    return row[1]
+
+
+def label_key(row):
+    """Sorts by label."""
+    return row[0]
+
+
+def sort_run(rows, key, reverse, directory):
+    """
+    Sorts one run in memory and writes it to a new temporary file in 'directory', returning the file's path.
+
+    Runs in a worker process, so it has to be a module level function. Only the path is sent back, not the sorted records.
+    """
+    rows.sort(key=key, reverse=reverse)
+    handle, path = tempfile.mkstemp(suffix=".run", dir=directory)
+    with open(handle, "w", encoding="utf-8", buffering=FILE_BUFFER) as run:
+        write_rows(rows, run)
+    return path
+
+
+def spill_runs(rows, run_size, key, reverse, directory, workers):
+    """
+    Reads 'rows' run_size at a time, and sorts each run into a temporary file, returning the files' paths in the order the runs were read.
+
+    With one worker the runs are sorted in this process. Otherwise, at most 'workers' runs are waiting in the pool at once; once that many are, the oldest is waited for before another is read.
+    """
+    rows = iter(rows)
+    batches = iter(lambda: list(islice(rows, run_size)) or None, None)
+
+    if workers == 1:
+        return [sort_run(batch, key, reverse, directory) for batch in batches]
+
+    workers = workers or os.cpu_count() or 1
+    paths = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for batch in batches:
+            if len(pending) >= workers:
+                paths.append(pending.popleft().result())
+            pending.append(executor.submit(sort_run, batch, key, reverse, directory))
+        paths.extend(future.result() for future in pending)
+    return paths
+
+
+def merge_runs(paths, destination, key, reverse):
+    """Merges the sorted runs in 'paths' into the stream 'destination', with a heap."""
+    runs = [open(path, encoding="utf-8", buffering=FILE_BUFFER) for path in paths]
+    try:
+        write_rows(heapq.merge(*map(read_rows, runs), key=key, reverse=reverse), destination)
+    finally:
+        for run in runs:
+            run.close()
+
+
+def merge_into_fewer_runs(paths, key, reverse, directory, max_open_runs):
+    """Merges groups of max_open_runs runs into single runs, deleting the old ones, until there are no more than max_open_runs. Returns the new paths, in order."""
+    while len(paths) > max_open_runs:
+        merged = []
+        for start in range(0, len(paths), max_open_runs):
+            group = paths[start:start + max_open_runs]
+            handle, path = tempfile.mkstemp(suffix=".run", dir=directory)
+            with open(handle, "w", encoding="utf-8", buffering=FILE_BUFFER) as run:
+                merge_runs(group, run, key, reverse)
+            for old_path in group:
+                os.remove(old_path)
+            merged.append(path)
+        paths = merged
+    return paths
+
+
+def external_sort(
+        source, destination, run_size=RUN_SIZE, workers=None, key=None, reverse=False,
+        max_open_runs=MAX_OPEN_RUNS, temporary_directory=None):
+    """
+    Sorts the 'label: value' lines of the text stream 'source' into the text stream 'destination'. See the top of this file for how.
+
+    'workers' is the number of processes that sort runs (None means one per processor core). The temporary files are made in temporary_directory (the system's usual one, if not given), and are all removed before returning, even if the sort fails.
+    """
+    if run_size < 1:
+        raise ValueError("run_size must be at least 1")
+    if max_open_runs < 2:
+        raise ValueError("max_open_runs must be at least 2")
+    key = value_key if key is None else key
+
+    with tempfile.TemporaryDirectory(dir=temporary_directory) as directory:
+        paths = spill_runs(read_rows(source), run_size, key, reverse, directory, workers)
+        paths = merge_into_fewer_runs(paths, key, reverse, directory, max_open_runs)
+        merge_runs(paths, destination, key, reverse)
+
+
+def main(arguments=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Sort a file of 'label: value' lines that may not fit in memory.")
+    parser.add_argument("input", help="file to sort")
+    parser.add_argument("output", help="file to write the sorted lines to")
+    parser.add_argument("--run-size", type=int, default=RUN_SIZE, help="records sorted in memory at a time")
+    parser.add_argument("--workers", type=int, help="processes sorting runs (default: one per core)")
+    parser.add_argument("--by", choices=("value", "label"), default="value", help="what to sort by")
+    parser.add_argument("--reverse", action="store_true", help="largest first")
+    parser.add_argument("--max-open-runs", type=int, default=MAX_OPEN_RUNS, help="most runs merged at once")
+    options = parser.parse_args(arguments)
+
+    key = label_key if options.by == "label" else value_key
+    with open(options.input, encoding="utf-8", buffering=FILE_BUFFER) as source, \
+            open(options.output, "w", encoding="utf-8", buffering=FILE_BUFFER) as destination:
+        external_sort(
+            source, destination, options.run_size, options.workers, key, options.reverse, options.max_open_runs)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
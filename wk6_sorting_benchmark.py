@@ -0,0 +1,264 @@
+"""
+Benchmarks for the sorts in wk6_bubble_sorting, and the alternatives to them.
+
+Four sorts are compared, each sorting (label, value) rows by value, largest first (the order bubble_sort() gives):
+
+- bubble_sort: LinkedList.bubble_sort(), O(n^2)
+- merge_sort: LinkedList.merge_sort(), O(n log n)
+- sorted: Python's sorted() on a list of the rows
+- numpy: wk6_columnar.ColumnarTable.sorted(), a NumPy argsort of the values
+
+on four kinds of input: 'sorted' (already in the order the sorts give), 'reversed' (the opposite order), 'random' and 'few-unique' (random, but with only FEW_UNIQUE different values), at sizes from 10 to 10^6 rows.
+
+Each case (a sort, a kind of input and a size) is run in a process of its own, so it can be stopped once it has taken longer than its timeout. The sort is run 'warmup' times untimed, then timed 'repetitions' times with time_checking_funcs.timetaken(), and the best and median times are reported. A new copy of the input is made before each run, and isn't timed. Once a sort has timed out at one size, it is skipped at every bigger size of the same input, as bubble sort at 10^6 rows would take days.
+
+Comparisons and swaps are counted in one more, untimed, run, as counting slows the sort down. The values are wrapped in CountedValue, an int that counts every time it is compared with <, >, <= or >=, and linked lists are made as CountingLinkedList, which counts each call to swap_with_next(). Swaps are only counted for bubble sort: merge sort relinks nodes rather than swapping them, and sorted() moves references about inside C. NumPy compares its values inside compiled code, so neither is counted for it.
+
+The results are written as CSV (or JSON), one row for each case:
+
+    python wk6_sorting_benchmark.py --sizes 10 100 1000 10000 --timeout 30 --format json --output results.json
+"""
+
+# imports
+import argparse  # reads the command line
+import csv  # writes the results as CSV
+import json  # writes the results as JSON
+import multiprocessing  # runs each case in a process that can be stopped
+import random  # makes the inputs
+import statistics  # finds the median time
+import sys  # used to exit with the right status, and to report progress
+import time  # measures each case's timeout
+
+from time_checking_funcs import timetaken
+from wk6_bubble_sorting import LinkedList
+from wk6_columnar import ColumnarTable
+from wk6_external_sort import value_key
+
+# default sizes, from 10 to 10^6 rows
+DEFAULT_SIZES = [10 ** power for power in range(1, 7)]
+
+# kinds of input
+INPUTS = ("sorted", "reversed", "random", "few-unique")
+
+# number of different values in a 'few-unique' input
+FEW_UNIQUE = 10
+
+# untimed runs before timing, timed runs, and seconds each case is given
+WARMUP = 1
+REPETITIONS = 3
+TIMEOUT = 30
+
+# columns of the results
+FIELDS = ("sort", "input", "size", "status", "repetitions", "best_seconds", "median_seconds", "comparisons", "swaps")
+
+
+class CountedValue(int):
+    """
+    An int that counts how many times it is compared with <, >, <= or >= in CountedValue.comparisons. Equality isn't counted, as none of the sorts use it.
+
+    The count is kept on the class, rather than on each value, so it has to be reset to 0 before each sort.
+    """
+
+    comparisons = 0
+
+    def __lt__(self, other):
+        CountedValue.comparisons += 1
+        return int.__lt__(self, other)
+
+    def __gt__(self, other):
+        CountedValue.comparisons += 1
+        return int.__gt__(self, other)
+
+    def __le__(self, other):
+        CountedValue.comparisons += 1
+        return int.__le__(self, other)
+
+    def __ge__(self, other):
+        CountedValue.comparisons += 1
+        return int.__ge__(self, other)
+
+
+class CountingLinkedList(LinkedList):
+    """A LinkedList that counts each call to swap_with_next() in CountingLinkedList.swaps. As with CountedValue, reset it to 0 before each sort."""
+
+    swaps = 0
+
+    def swap_with_next(self):
+        CountingLinkedList.swaps += 1
+        super().swap_with_next()
+
+
+# for each sort: a function making a copy of the rows to sort (given the rows and the LinkedList class to use), the sort itself, and whether its comparisons can be counted
+SORTS = {
+    "bubble_sort": (lambda rows, list_class: list_class(rows), lambda linked: linked.bubble_sort(), True),
+    "merge_sort": (lambda rows, list_class: list_class(rows), lambda linked: linked.merge_sort(reverse=True), True),
+    "sorted": (lambda rows, list_class: list(rows), lambda rows: sorted(rows, key=value_key, reverse=True), True),
+    "numpy": (lambda rows, list_class: ColumnarTable.from_rows(rows), lambda table: table.sorted(reverse=True), False),
+}
+
+
+def make_input(kind, size, seed=0):
+    """Returns 'size' (label, value) rows of the given kind of input."""
+    generator = random.Random(seed)
+    if kind == "sorted":
+        values = range(size, 0, -1)
+    elif kind == "reversed":
+        values = range(1, size + 1)
+    elif kind == "random":
+        values = [generator.randrange(size * 10) for _ in range(size)]
+    elif kind == "few-unique":
+        values = [generator.randrange(FEW_UNIQUE) for _ in range(size)]
+    else:
+        raise ValueError(f"unknown kind of input {kind!r}")
+    return [(f"row {place}", value) for place, value in enumerate(values)]
+
+
+def run_case(sort, kind, size, repetitions, warmup, count, seed, connection):
+    """
+    Runs one case, in a process of its own, sending each result down 'connection' as soon as it has it: ("times", a list of seconds), then ("counts", (comparisons, swaps)) if count is True, and finally ("done", None). An exception is sent as ("error", its message).
+    """
+    try:
+        prepare, run, countable = SORTS[sort]
+        rows = make_input(kind, size, seed)
+
+        for _ in range(warmup):
+            run(prepare(rows, LinkedList))
+
+        times = []
+        for _ in range(repetitions):
+            prepared = prepare(rows, LinkedList)
+            times.append(timetaken(run, prepared))
+        connection.send(("times", times))
+
+        if count and countable:
+            counted = [(label, CountedValue(value)) for label, value in rows]
+            prepared = prepare(counted, CountingLinkedList)
+            CountedValue.comparisons = 0
+            CountingLinkedList.swaps = 0
+            run(prepared)
+            swaps = CountingLinkedList.swaps if sort == "bubble_sort" else None
+            connection.send(("counts", (CountedValue.comparisons, swaps)))
+
+        connection.send(("done", None))
+    except Exception as error:
+        connection.send(("error", f"{type(error).__name__}: {error}"))
+    finally:
+        connection.close()
+
+
+def benchmark_case(sort, kind, size, repetitions=REPETITIONS, warmup=WARMUP, timeout=TIMEOUT, count=True, seed=0):
+    """
+    Runs one case in another process, stopping it if it is still running after 'timeout' seconds. Returns its results as a dictionary with the keys in FIELDS.
+
+    The status is 'ok', 'timeout' (the timed runs didn't finish), 'counts timed out' (they did, but the counting run didn't) or the message of an exception.
+    """
+    result = dict.fromkeys(FIELDS)
+    result.update(sort=sort, input=kind, size=size, status="timeout", repetitions=repetitions)
+
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(
+        target=run_case, args=(sort, kind, size, repetitions, warmup, count, seed, sender), daemon=True)
+    process.start()
+    sender.close()
+
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not receiver.poll(remaining):
+                break
+            message, value = receiver.recv()
+            if message == "times":
+                result["best_seconds"] = min(value) if value else None
+                result["median_seconds"] = statistics.median(value) if value else None
+                result["status"] = "counts timed out"
+            elif message == "counts":
+                result["comparisons"], result["swaps"] = value
+            elif message == "done":
+                result["status"] = "ok"
+                break
+            else:
+                result["status"] = value
+                break
+    except EOFError:
+        result["status"] = "process ended without a result"
+    finally:
+        if process.is_alive():
+            process.terminate()
+        process.join()
+        receiver.close()
+    return result
+
+
+def run_benchmarks(
+        sorts=tuple(SORTS), inputs=INPUTS, sizes=DEFAULT_SIZES, repetitions=REPETITIONS, warmup=WARMUP,
+        timeout=TIMEOUT, count=True, seed=0, progress=None):
+    """
+    Runs every case, smallest size first, returning a list of the results. A sort that doesn't finish at one size (status other than 'ok') is skipped, with status 'skipped', at every bigger size of the same input.
+
+    'progress', if given, is called with each result as it is finished.
+    """
+    results = []
+    for sort in sorts:
+        for kind in inputs:
+            stopped = False
+            for size in sorted(sizes):
+                if stopped:
+                    result = dict.fromkeys(FIELDS)
+                    result.update(sort=sort, input=kind, size=size, status="skipped", repetitions=0)
+                else:
+                    result = benchmark_case(sort, kind, size, repetitions, warmup, timeout, count, seed)
+                    stopped = result["status"] != "ok"
+                results.append(result)
+                if progress is not None:
+                    progress(result)
+    return results
+
+
+def write_results(results, stream, format="csv"):
+    """Writes the results to a text stream as CSV (with a header row) or as a JSON list."""
+    if format == "json":
+        json.dump(results, stream, indent=2)
+        stream.write("\n")
+    else:
+        writer = csv.DictWriter(stream, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def main(arguments=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Compare bubble sort with merge sort, sorted() and NumPy.")
+    parser.add_argument("--sorts", nargs="+", choices=tuple(SORTS), default=tuple(SORTS), help="sorts to run")
+    parser.add_argument("--inputs", nargs="+", choices=INPUTS, default=INPUTS, help="kinds of input")
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES, help="numbers of rows")
+    parser.add_argument("--repetitions", type=int, default=REPETITIONS, help="timed runs of each case")
+    parser.add_argument("--warmup", type=int, default=WARMUP, help="untimed runs before timing")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT, help="seconds each case is given")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the random inputs")
+    parser.add_argument("--no-counts", action="store_true", help="don't count comparisons and swaps")
+    parser.add_argument("--format", choices=("csv", "json"), default="csv", help="format of the results")
+    parser.add_argument("--output", help="file to write the results to (default: the screen)")
+    options = parser.parse_args(arguments)
+    if options.repetitions < 1:
+        parser.error("--repetitions must be at least 1")
+
+    def progress(result):
+        seconds = result["median_seconds"]
+        timing = f"{seconds:.6f} s" if seconds is not None else ""
+        print(f"{result['sort']:>12} {result['input']:>10} {result['size']:>8} {result['status']:>16} {timing}", file=sys.stderr)
+
+    results = run_benchmarks(
+        options.sorts, options.inputs, options.sizes, options.repetitions, options.warmup,
+        options.timeout, not options.no_counts, options.seed, progress)
+
+    if options.output is None:
+        write_results(results, sys.stdout, options.format)
+    else:
+        with open(options.output, "w", encoding="utf-8", newline="") as stream:
+            write_results(results, stream, options.format)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
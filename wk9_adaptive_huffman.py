@@ -0,0 +1,323 @@
+"""
+An adaptive (single pass) version of the Huffman encoding in wk9_huffman, using the FGK algorithm (Faller, Gallager and Knuth).
+
+Huffman_encoding_maker has to count every character of a message before it can build its tree, so nothing can be sent until the whole message has been read. The adaptive version starts with an empty tree and updates it after every character. The encoder and decoder make exactly the same updates, in the same order, so they always agree on the codes without the tree ever being sent. This means each character can be sent as soon as it arrives.
+
+The tree starts out with a single 'not yet transmitted' (NYT) leaf, which has a weight (count) of 0. The first time a character appears, the encoder sends the NYT leaf's code followed by the character itself, written out in full (RAW_TEXT_BITS or RAW_BYTE_BITS bits). After that the character has its own leaf, and is sent using that leaf's code.
+
+To keep the tree a valid Huffman tree as the counts change, FGK relies on the 'sibling property': if the nodes are listed in order of weight, each node is next to its sibling. The model keeps that list in self.order, heaviest first, with the root at position 0. Before a node's weight is increased, it is swapped with the first node in the list that has the same weight (its 'block leader'). This keeps the list in order after the increase.
+
+The end of a message is marked by sending the NYT code followed by an 'end of message' value that can't be a real character. Without this the decoder couldn't tell the padding bits of the final byte from the start of another character.
+
+There are three classes:
+
+1) Adaptive_Huffman_model holds the tree and updates it. It is shared by the encoder and decoder.
+2) Adaptive_Huffman_encoder encodes a message a chunk at a time, returning the bytes that are ready after each chunk.
+3) Adaptive_Huffman_decoder decodes those bytes a chunk at a time, returning the characters that are ready after each chunk.
+
+The encoder and decoder work on text (str) by default, or on bytes if made with binary=True.
+"""
+
+# imports
+from wk9_huffman import Bit_writer
+
+# number of bits used to send a character (its Unicode code point) the first time it appears
+RAW_TEXT_BITS = 21
+
+# number of bits used to send a byte the first time it appears
+RAW_BYTE_BITS = 9
+
+# 'end of message' values. Neither can be a real character or byte.
+END_OF_TEXT = (1 << RAW_TEXT_BITS) - 1
+END_OF_BYTES = 256
+
+
+class Adaptive_Huffman_model:
+    """
+    The tree shared by Adaptive_Huffman_encoder and Adaptive_Huffman_decoder.
+
+    update() is called once for every character, by both sides, after the character has been encoded or decoded.
+    """
+
+    class Node:
+        """A node of the adaptive tree. __slots__ is used as there will be two of these for every unique character."""
+
+        __slots__ = ("weight", "index", "parent", "left", "right", "symbol")
+
+        def __init__(self, index, parent=None, symbol=None):
+            # how many times the characters below this node have appeared so far
+            self.weight = 0
+
+            # position of this node in the model's list of nodes
+            self.index = index
+
+            # the node above this one, and the two below it (None for a leaf)
+            self.parent = parent
+            self.left = None
+            self.right = None
+
+            # the character of a leaf (None for internal nodes and the NYT leaf)
+            self.symbol = symbol
+
+        def is_leaf(self):
+            return self.left is None
+
+    def __init__(self):
+        # the tree starts out as just the NYT leaf
+        self.nyt = self.Node(0)
+        self.root = self.nyt
+
+        # every node, heaviest first. A node's index is its position in this list.
+        self.order = [self.nyt]
+
+        # leaf for each character seen so far
+        self.leaves = {}
+
+    def code(self, node):
+        """
+        Returns the code of 'node' as a (code, length) pair, by walking from the node up to the root.
+
+        A left branch is a 0 and a right branch is a 1. Complexity is O(depth of node).
+        """
+        code = 0
+        length = 0
+        while node.parent is not None:
+            if node is node.parent.right:
+                code |= 1 << length
+            length += 1
+            node = node.parent
+        return code, length
+
+    def __block_leader(self, node):
+        """
+        Returns the first node in self.order with the same weight as 'node'.
+
+        Because the list is kept in order of weight, all the nodes with the same weight are next to each other, so this walks back from the node until the weight changes. Complexity is O(b), where b is the number of nodes with that weight.
+        """
+        index = node.index
+        weight = node.weight
+        order = self.order
+        while index > 0 and order[index - 1].weight == weight:
+            index -= 1
+        return order[index]
+
+    def __swap(self, first, second):
+        """
+        Swaps two nodes (along with everything below them) in the tree, and swaps their places in self.order.
+
+        Neither node can be an ancestor of the other.
+        """
+        first_parent = first.parent
+        second_parent = second.parent
+
+        # point each parent at its new child. If the two nodes are siblings,
+        # swapping the parent's left and right is all that is needed.
+        if first_parent is second_parent:
+            first_parent.left, first_parent.right = first_parent.right, first_parent.left
+        else:
+            if first_parent.left is first:
+                first_parent.left = second
+            else:
+                first_parent.right = second
+            if second_parent.left is second:
+                second_parent.left = first
+            else:
+                second_parent.right = first
+            first.parent, second.parent = second_parent, first_parent
+
+        # swap places in the list of nodes
+        self.order[first.index], self.order[second.index] = second, first
+        first.index, second.index = second.index, first.index
+
+    def __add_symbol(self, symbol):
+        """
+        Gives a new character a leaf of its own, by splitting the NYT leaf into an internal node with two children: a new NYT leaf (on the left) and the new character's leaf (on the right).
+
+        The internal node keeps the old NYT leaf's place in the list; the two children go on the end, as they are the lightest nodes in the tree. Returns the new leaf.
+        """
+        internal = self.nyt
+        leaf = self.Node(len(self.order), internal, symbol)
+        nyt = self.Node(len(self.order) + 1, internal)
+
+        internal.left = nyt
+        internal.right = leaf
+
+        self.order.append(leaf)
+        self.order.append(nyt)
+        self.leaves[symbol] = leaf
+        self.nyt = nyt
+
+        return leaf
+
+    def update(self, symbol):
+        """
+        Adds one to the count of 'symbol' and rearranges the tree so it is still a Huffman tree.
+
+        Working up from the character's leaf to the root, each node is first swapped with the leader of its block (unless the leader is its own parent) and then has its weight increased by 1. Complexity is O(depth of the leaf) swaps, plus the block searches.
+        """
+        node = self.leaves.get(symbol)
+        if node is None:
+            node = self.__add_symbol(symbol)
+
+        while node is not None:
+            leader = self.__block_leader(node)
+            if leader is not node and leader is not node.parent:
+                self.__swap(node, leader)
+            node.weight += 1
+            node = node.parent
+
+
+class Adaptive_Huffman_encoder:
+    """
+    Encodes a message in a single pass, a chunk at a time.
+
+    Each call to encode() returns the whole bytes that are ready so far, so output starts straight away. finish() writes the end of message marker and returns the last bytes, with the final byte padded with 0s.
+    """
+
+    def __init__(self, binary=False):
+        self.binary = binary
+        self.raw_bits = RAW_BYTE_BITS if binary else RAW_TEXT_BITS
+        self.end_of_message = END_OF_BYTES if binary else END_OF_TEXT
+
+        self.model = Adaptive_Huffman_model()
+        self.writer = Bit_writer()
+
+    def __write_symbol(self, symbol):
+        """Writes the code for one character (as an int), then updates the model."""
+        model = self.model
+        leaf = model.leaves.get(symbol)
+
+        if leaf is not None:
+            self.writer.write(*model.code(leaf))
+        else:
+            # first appearance: the NYT code, then the character in full
+            self.writer.write(*model.code(model.nyt))
+            self.writer.write(symbol, self.raw_bits)
+
+        model.update(symbol)
+
+    def encode(self, chunk):
+        """Encodes a chunk of the message (a str, or bytes if binary) and returns the bytes that are ready."""
+        symbols = chunk if self.binary else map(ord, chunk)
+        for symbol in symbols:
+            self.__write_symbol(symbol)
+        return self.writer.take()
+
+    def finish(self):
+        """Writes the end of message marker and returns the remaining bytes. The encoder can't be used after this."""
+        model = self.model
+        self.writer.write(*model.code(model.nyt))
+        self.writer.write(self.end_of_message, self.raw_bits)
+        return self.writer.getvalue()
+
+
+class Adaptive_Huffman_decoder:
+    """
+    Decodes bytes made by Adaptive_Huffman_encoder, a chunk at a time.
+
+    Each call to decode() returns the characters that could be decoded from the bytes given so far. Once the end of message marker has been read, 'finished' is set to True, and anything after it is ignored.
+    """
+
+    def __init__(self, binary=False):
+        self.binary = binary
+        self.raw_bits = RAW_BYTE_BITS if binary else RAW_TEXT_BITS
+        self.end_of_message = END_OF_BYTES if binary else END_OF_TEXT
+
+        self.model = Adaptive_Huffman_model()
+        self.finished = False
+
+        # where the decoder has got to in the tree
+        self.node = self.model.root
+
+        # a character being read in full after the NYT code: its bits so far, and how many are still to come
+        self.raw_value = 0
+        self.raw_remaining = 0
+
+    def __symbol_decoded(self, symbol, decoded):
+        """Records a decoded character (or the end of the message), updates the model and goes back to the root."""
+        if symbol == self.end_of_message:
+            self.finished = True
+            return
+        decoded.append(symbol)
+        self.model.update(symbol)
+        self.node = self.model.root
+
+    def __reached_leaf(self, decoded):
+        """Called whenever the decoder arrives at a leaf (including the root, while the tree is just the NYT leaf)."""
+        if self.node is self.model.nyt:
+            self.raw_value = 0
+            self.raw_remaining = self.raw_bits
+        else:
+            self.__symbol_decoded(self.node.symbol, decoded)
+
+    def decode(self, chunk):
+        """Decodes a chunk of encoded bytes and returns the characters (or bytes, if binary) that are ready."""
+        decoded = []
+
+        # the very first character always starts with an empty NYT code
+        if self.node.is_leaf() and not self.raw_remaining and not self.finished:
+            self.__reached_leaf(decoded)
+
+        for byte in chunk:
+            for shift in range(7, -1, -1):
+                if self.finished:
+                    break
+                bit = (byte >> shift) & 1
+
+                # part way through a character sent in full
+                if self.raw_remaining:
+                    self.raw_value = (self.raw_value << 1) | bit
+                    self.raw_remaining -= 1
+                    if not self.raw_remaining:
+                        self.__symbol_decoded(self.raw_value, decoded)
+                        if self.node.is_leaf() and not self.finished:
+                            self.__reached_leaf(decoded)
+                    continue
+
+                # follow the bit down the tree
+                self.node = self.node.right if bit else self.node.left
+                if self.node.is_leaf():
+                    self.__reached_leaf(decoded)
+
+        if self.binary:
+            return bytes(decoded)
+        return "".join(map(chr, decoded))
+
+
+def encode(message, binary=False):
+    """Encodes a whole message in one call. Mostly useful for testing."""
+    encoder = Adaptive_Huffman_encoder(binary)
+    return encoder.encode(message) + encoder.finish()
+
+
+def decode(encoded, binary=False):
+    """Decodes a whole message in one call. Raises ValueError if the end of message marker is never reached."""
+    decoder = Adaptive_Huffman_decoder(binary)
+    decoded = decoder.decode(encoded)
+    if not decoder.finished:
+        raise ValueError("encoded message ends before its end of message marker")
+    return decoded
+
+
+if __name__ == "__main__":
+    ''' Tests that messages survive being encoded and decoded, a few characters at a time '''
+
+    samples = (
+        "There is a spectre haunting europe, the spectre of communism.",
+        "The worker must have bread, but she must have roses, too.",
+        "sphynx of black quartz judge my vow",
+    )
+
+    for sample in samples:
+        encoder = Adaptive_Huffman_encoder()
+        decoder = Adaptive_Huffman_decoder()
+        decoded = ""
+
+        # send the sample a few characters at a time, as if it was arriving live
+        for start in range(0, len(sample), 5):
+            decoded += decoder.decode(encoder.encode(sample[start:start + 5]))
+        decoded += decoder.decode(encoder.finish())
+
+        print(f"\n{sample}")
+        print(f"decoded correctly: {decoded == sample}, finished: {decoder.finished}")
+        print(f"{len(sample.encode('utf-8'))} bytes as UTF-8, {len(encode(sample))} bytes encoded")
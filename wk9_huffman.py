@@ -5,17 +5,810 @@ Subfunctions in the class then work to encode the string as follows:
 
 1) _count_of_characters() counts how many times each character in the string appears
 2) _list_of_nodes_from_counts() uses that count to make a list of node objects, one for each unique character. These will be the 'leaves' of the Huffman binary tree.
-3) _place_nodes_in_tree() then works backwards from those leaves to make the rest of the binary tree.
-4) _get_codes_from_tree() then traverses that tree to generate the Huffman codes for each character in the original message.
-5) encode() takes the message and encodes it into a binary string using the codes just generated.
-6 _get_decoding_function() returns a decoding function that already knows then unique encoding for this message.
-7) decode() decodes the encoded message.
+3) _place_nodes_in_tree() then works backwards from those leaves to make the rest of the binary tree, using a priority queue (or two plain queues, when the counts are already sorted).
+4) get_codes_from_tree() then traverses that tree to generate the Huffman codes for each character in the original message. Only the length of each code is kept; canonical_codes() turns those lengths into the codes that are actually used.
+5) encode() takes the message and packs it into bytes using the codes just generated. The number of bits used is kept in bit_length.
+6) get_decoding_function() returns a decoding function that already knows the unique encoding for this message. It is the decode() method of a Huffman_decoder, which decodes a byte at a time using a look-up table.
+
+get_frame() packs the encoded message, with a compact table of code lengths, into a frame of bytes. The module level decode() function can decode that frame on its own, in any process.
+
+compress_stream() and decompress_stream() do the same for files of any size, a chunk at a time. They are also available from the command line (see main()).
+
+Messages can be text (str) or bytes (bytes, bytearray, memoryview or mmap). Bytes messages use an alphabet of the 256 byte values.
+
+If the object is made with an index_interval, its frame also holds a 'sync point' every index_interval characters. decode_range() uses these to decode any part of the message without decoding everything before it, and a Huffman_frame_reader does the same for many reads from one frame, building its decoder only once.
+
+For very large alphabets, compact_tree=True builds the tree in typed arrays (Huffman_array_tree) instead of node objects.
 
 I have also included test functions in the 'if __name__ == "main"' section of the file, to test out functionality.
 """
 
 # imports
-from sys import getsizeof #used for size comparison when testing the function
+import io #used to read frames held in memory
+import sys #used to check the byte order of the machine
+import argparse #used to read the command line options
+import struct #used to pack the header of a frame
+from array import array #typed arrays used by Huffman_array_tree
+import heapq #priority queue used to build the tree
+import mmap #memory mapped files can be encoded like bytes
+from collections import Counter, deque #Counter counts characters; queues build the tree when counts are already sorted
+
+# NumPy is optional. If it is installed, bytes are counted with a single vectorised pass.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# number of characters encoded in a single step by Huffman_encoding_maker.encode()
+ENCODE_CHUNK = 1 << 16
+
+# number of bytes counted in a single step by count_symbols(), when NumPy is installed
+COUNT_CHUNK = 1 << 16
+
+# number of bytes decoded in a single step by Huffman_decoder.decode()
+DECODE_CHUNK = 1 << 20
+
+# most rows Huffman_decoder builds for its table (each one is 256 entries), and how many times a state has to be
+# reached before it gets a row. Other states decode their bytes by walking the tree a bit at a time.
+MAX_ROWS = 512
+ROW_AFTER = 16
+
+# first bytes of every frame made by make_frame(), and the version of the layout
+FRAME_MAGIC = b"HUFF"
+FRAME_VERSION = 1
+
+# bit set in a frame's flags when the message is bytes rather than text
+FLAG_BYTES = 1
+
+# bit set in a frame's flags when a sync point index follows the encoded message
+FLAG_INDEX = 2
+
+# position of the flags byte in a frame
+FLAGS_OFFSET = 5
+
+# layout of the start of a sync point index: the interval, the number of characters, and the number of sync points
+INDEX_HEADER = struct.Struct(">IQI")
+
+# types of message that are encoded as bytes, with an alphabet of the 256 byte values
+BINARY_TYPES = (bytes, bytearray, memoryview, mmap.mmap)
+
+# number of characters (or bytes) read at a time by the streaming functions
+STREAM_CHUNK = 1 << 20
+
+
+def is_binary(message):
+    """Returns True if 'message' is bytes-like (bytes, bytearray, memoryview or mmap), rather than text."""
+    return isinstance(message, BINARY_TYPES)
+
+
+def count_symbols(message):
+    """
+    Returns a dictionary of how many times each character appears in 'message'.
+
+    For text the characters are strings. For bytes-like messages they are the byte values (whole numbers from 0 to 255).
+
+    Bytes are counted with numpy.bincount() over a view of the message's own memory, if NumPy is installed. That is a single vectorised pass over the message, without copying it. Otherwise (and for text) collections.Counter is used, which does its counting in C.
+    """
+    if not is_binary(message):
+        return dict(Counter(message))
+
+    view = memoryview(message).cast("B")
+    if numpy is not None:
+        values = numpy.frombuffer(view, dtype=numpy.uint8)
+
+        # bincount() widens its input to 64 bit integers, so the bytes are counted in slices
+        # small enough for that copy to stay in the processor's cache
+        histogram = numpy.zeros(256, dtype=numpy.int64)
+        for start in range(0, len(values), COUNT_CHUNK):
+            histogram += numpy.bincount(values[start:start + COUNT_CHUNK], minlength=256)
+        return {byte: int(histogram[byte]) for byte in numpy.flatnonzero(histogram).tolist()}
+
+    return dict(Counter(view))
+
+
+class Bit_writer:
+    """
+    Packs codes of any length into a bytearray, most significant bit first.
+
+    Bits that don't yet fill a whole byte are held in an int until the next write. Once a write fills one or more bytes, they are moved into the buffer. This means that however long the message is, the int never holds more than 7 bits plus the code just written.
+    """
+
+    def __init__(self):
+        # whole bytes written so far
+        self.buffer = bytearray()
+
+        # total number of bits written (not counting padding)
+        self.bit_length = 0
+
+        # bits that don't fill a whole byte yet, and how many there are
+        self.pending = 0
+        self.pending_bits = 0
+
+    def write(self, code, length):
+        """Writes the lowest 'length' bits of the int 'code'."""
+        self.pending = (self.pending << length) | code
+        self.pending_bits += length
+        self.bit_length += length
+
+        # move any complete bytes into the buffer
+        if self.pending_bits >= 8:
+            leftover = self.pending_bits & 7
+            self.buffer += (self.pending >> leftover).to_bytes(self.pending_bits >> 3, "big")
+            self.pending &= (1 << leftover) - 1
+            self.pending_bits = leftover
+
+    def write_bits(self, bits):
+        """Writes a string of 0s and 1s."""
+        if bits:
+            self.write(int(bits, 2), len(bits))
+
+    def take(self):
+        """Returns the whole bytes written since the last call to take(), and removes them from the buffer. Used to write encoded messages out a piece at a time."""
+        taken = bytes(self.buffer)
+        self.buffer.clear()
+        return taken
+
+    def getvalue(self):
+        """Returns everything written so far as bytes, with the final byte padded with 0s."""
+        if self.pending_bits:
+            return bytes(self.buffer) + bytes([self.pending << (8 - self.pending_bits)])
+        return bytes(self.buffer)
+
+
+class Huffman_decoder:
+    """
+    Decodes bytes made by Huffman_encoding_maker.encode(), reading them a whole byte (8 bits) at a time.
+
+    The codes are first put into a binary tree (a 'trie') where a 0 bit means 'go left' and a 1 bit means 'go right'. Each combined (internal) node of that tree is a 'state', meaning 'this much of a code has been read so far'. State 0 is the root, ie 'at the start of a code'.
+
+    For every state, a row of 256 entries is worked out: one for each possible value of the next byte. Each entry holds the characters that byte completes, and the state the decoder is left in afterwards. Decoding is then one table look-up per byte of input, with no slicing of strings and no new strings made per character.
+
+    For bytes messages the table's characters are byte values, and decoding returns bytes.
+
+    Codes of any length are handled, because a code longer than 8 bits just leaves the decoder in a deeper state at the end of the byte.
+
+    The row for state 0 is the main table: it is indexed by the first 8 bits of a code, and it is built straight away. Other rows are only built once their state has been reached ROW_AFTER times, and no more than MAX_ROWS rows are ever built. Until then, or once the limit is reached, a byte read in a state without a row is decoded by walking the tree one bit at a time. A byte alphabet has at most 255 states, so every state it uses soon gets a row. An alphabet of tens of thousands of characters has as many states, most of them deep in the tree and rarely reached, and building a 256 entry row for each would take far more time and memory than decoding the message (a 20,000 character alphabet took 185 MB). This keeps the table to at most MAX_ROWS * 256 entries, however big the alphabet is.
+
+    An earlier version converted the whole message into a string of 0s and 1s, checked ever longer slices of it against a dictionary, and removed each code it found with string.replace(). That made decoding O(e^2), where e is the length of the encoded message. This version is O(e).
+    """
+
+    class Rows(dict):
+        """
+        Dictionary of state: row. A state without a row counts how many times it has been looked up, and gets a row once that reaches ROW_AFTER (unless MAX_ROWS rows have been built). Until then a Walking_row is returned, which works each entry out as it is asked for.
+        """
+
+        def __init__(self, decoder):
+            self.decoder = decoder
+            self.visits = Counter()
+
+        def __missing__(self, state):
+            self.visits[state] += 1
+            if self.visits[state] < ROW_AFTER or len(self) >= MAX_ROWS:
+                return self.decoder.Walking_row(self.decoder, state)
+            del self.visits[state]
+            row = self.decoder.build_row(state)
+            self[state] = row
+            return row
+
+    class Walking_row:
+        """Stands in for the row of a state that hasn't got one. Looking up a byte walks the tree through its 8 bits."""
+
+        __slots__ = ("decoder", "state")
+
+        def __init__(self, decoder, state):
+            self.decoder = decoder
+            self.state = state
+
+        def __getitem__(self, byte):
+            return self.decoder.walk(self.state, byte, 8)
+
+    def __init__(self, encoding_table, binary=False):
+
+        # decoded pieces are joined onto an empty string, or empty bytes
+        self.empty = b"" if binary else ""
+
+        # the characters of the alphabet; leaves of the tree point into this list
+        self.characters = [bytes([byte]) for byte in encoding_table] if binary else list(encoding_table)
+
+        # the tree is a list of [zero child, one child] pairs, one for each internal node.
+        # A child that is a whole number (0 or more) is another internal node.
+        # A child that is negative is a leaf: ~child is the position of its character in self.characters.
+        # None means no code goes that way.
+        self.tree = [[None, None]]
+        for position, character in enumerate(encoding_table):
+            self.__add_code(encoding_table[character], ~position)
+
+        # the main table, for state 0, is always built
+        self.rows = self.Rows(self)
+        self.rows[0] = self.build_row(0)
+
+        # length of the longest code, used to work out how many bytes decode_from() needs
+        self.longest = max(map(len, encoding_table.values()), default=0)
+
+    def __add_code(self, code, leaf):
+        """
+        Walks down the tree following the bits of 'code', adding internal nodes where needed, and places the leaf at the end.
+
+        Raises ValueError if the code is empty, or if it runs into another code (one code starting with another), as the codes could then not be told apart.
+        """
+        if not code:
+            raise ValueError("encoding table contains an empty code")
+        node = 0
+        for bit in code[:-1]:
+            child = self.tree[node][bit == "1"]
+            if child is None:
+                child = len(self.tree)
+                self.tree.append([None, None])
+                self.tree[node][bit == "1"] = child
+            elif child < 0:
+                raise ValueError("encoding table is not a prefix code: one code starts with another")
+            node = child
+        if self.tree[node][code[-1] == "1"] is not None:
+            raise ValueError("encoding table is not a prefix code: one code starts with another")
+        self.tree[node][code[-1] == "1"] = leaf
+
+    def walk(self, state, bits, count):
+        """
+        Follows the lowest 'count' bits of the int 'bits' through the tree, starting at 'state'.
+
+        Returns the characters completed along the way and the state the decoder ends up in. This is used to build the rows of the table, and to decode the final, partly filled byte of a message.
+        """
+        characters = []
+        for shift in range(count - 1, -1, -1):
+            state = self.tree[state][(bits >> shift) & 1]
+            if state is None:
+                raise ValueError("encoded message contains a code that is not in the encoding table")
+            if state < 0:
+                characters.append(self.characters[~state])
+                state = 0
+        return self.empty.join(characters), state
+
+    def build_row(self, state):
+        """
+        Builds the row of the table for one state. Each of its 256 entries is the (characters, next state) pair for one byte value.
+
+        A byte that runs into a code that isn't in the table gets None, which decode() reports as an error if it is ever read.
+        """
+        row = []
+        for byte in range(256):
+            try:
+                row.append(self.walk(state, byte, 8))
+            except ValueError:
+                row.append(None)
+        return tuple(row)
+
+    def feed(self, data, state=0):
+        """
+        Decodes every byte of 'data', starting in 'state'.
+
+        Returns the characters decoded and the state the decoder finished in. Passing that state to the next call lets a message be decoded one piece at a time.
+        """
+        rows = self.rows
+        decoded = []
+        append = decoded.append
+
+        try:
+            for byte in data:
+                characters, state = rows[state][byte]
+                append(characters)
+        except TypeError:
+            raise ValueError("encoded message contains a code that is not in the encoding table") from None
+
+        return self.empty.join(decoded), state
+
+    def decode(self, encoded, bit_length):
+        """
+        Decodes the first 'bit_length' bits of 'encoded'.
+
+        Whole bytes are decoded DECODE_CHUNK bytes at a time through the table. Any bits left over in the final byte are decoded by walking the tree, so the padding is never read.
+        """
+        whole_bytes, extra_bits = divmod(bit_length, 8)
+        if len(encoded) * 8 < bit_length:
+            raise ValueError("encoded message is shorter than its bit length")
+
+        view = memoryview(encoded)
+        decoded = []
+        state = 0
+
+        for start in range(0, whole_bytes, DECODE_CHUNK):
+            characters, state = self.feed(view[start:min(start + DECODE_CHUNK, whole_bytes)], state)
+            decoded.append(characters)
+
+        # decode the bits at the start of the final byte
+        if extra_bits:
+            characters, state = self.walk(state, encoded[whole_bytes] >> (8 - extra_bits), extra_bits)
+            decoded.append(characters)
+
+        if state != 0:
+            raise ValueError("encoded message ends part way through a code")
+
+        return self.empty.join(decoded)
+
+    def decode_from(self, encoded, start_bit, bit_length, count):
+        """
+        Decodes 'count' characters, starting from bit 'start_bit' of 'encoded' (which must be the start of a code), without reading past bit 'bit_length'.
+
+        The bits before the next byte boundary are decoded by walking the tree. After that, just enough whole bytes are fed through the table to reach 'count' characters: no code is longer than self.longest bits, so that many bits per character is always enough.
+        """
+        decoded = []
+        total = 0
+        state = 0
+        position, offset = divmod(start_bit, 8)
+
+        # decode the rest of the first byte, if the start isn't on a byte boundary
+        if offset:
+            bits = min(8 - offset, bit_length - start_bit)
+            value = (encoded[position] >> (8 - offset - bits)) & ((1 << bits) - 1)
+            characters, state = self.walk(state, value, bits)
+            decoded.append(characters)
+            total += len(characters)
+            position += 1
+
+        # decode whole bytes until there are enough characters
+        whole_bytes, extra_bits = divmod(bit_length, 8)
+        view = memoryview(encoded)
+        while total < count and position < whole_bytes:
+            needed = ((count - total) * self.longest + 7) // 8
+            end = min(position + max(needed, 1), position + DECODE_CHUNK, whole_bytes)
+            characters, state = self.feed(view[position:end], state)
+            decoded.append(characters)
+            total += len(characters)
+            position = end
+
+        # decode the bits at the start of the final byte, if they're needed
+        if total < count and extra_bits and position == whole_bytes:
+            characters, state = self.walk(state, encoded[whole_bytes] >> (8 - extra_bits), extra_bits)
+            decoded.append(characters)
+
+        return self.empty.join(decoded)[:count]
+
+
+def canonical_codes(code_lengths):
+    """
+    Takes a dictionary of character: code length, and returns a dictionary of character: code, where the codes are 'canonical' Huffman codes.
+
+    Any set of code lengths made by Huffman's algorithm can be given codes in a standard way: sort the characters by (code length, character), give the first one a code of all 0s, and count upwards in binary from there, adding a 0 to the end of the code each time the length goes up.
+
+    Because the codes can be rebuilt from the lengths alone, only the lengths need to be stored alongside an encoded message. The codes are exactly as short as the ones read off the tree, so nothing is lost in compression.
+
+    Complexity is O(u log u), for the sort.
+    """
+    codes = {}
+    code = 0
+    previous_length = 0
+
+    for character in sorted(code_lengths, key=lambda character: (code_lengths[character], character)):
+        length = code_lengths[character]
+
+        # make room for the longer code by adding 0s to the end
+        code <<= length - previous_length
+        previous_length = length
+
+        codes[character] = format(code, "b").zfill(length)
+        code += 1
+
+    return codes
+
+
+def length_limited_code_lengths(counts, max_length):
+    """
+    Returns a dictionary of character: code length, giving the shortest possible encoded message in which no code is longer than 'max_length' bits. This uses the package-merge algorithm (Larmore and Hirschberg).
+
+    Huffman's algorithm gives the best codes when there is no limit, but on very uneven counts its codes can be up to u-1 bits long. Long codes make look-up table decoders big and slow, so it can be worth giving up a little compression to cap them.
+
+    Package-merge works like this. Start with a list of the characters, sorted by count. Then, max_length - 1 times: pair up neighbouring items in the list into 'packages' (whose count is the sum of the pair), and merge the packages back into a fresh copy of the sorted characters. Finally, take the 2u-2 cheapest items. A character's code length is the number of times it appears in those items (counting the characters inside packages).
+
+    Packages are stored as a pair of the items they were made from, rather than as a list of their characters, so each step makes only O(u) new objects. Complexity is O(u * max_length).
+    """
+    characters = sorted(counts, key=lambda character: (counts[character], character))
+    if len(characters) <= 1:
+        return {character: 1 for character in characters}
+    if (1 << max_length) < len(characters):
+        raise ValueError(f"{len(characters)} characters can't all have codes of {max_length} bits or fewer")
+
+    # an item is (count, position of the character) or (count, (item, item)) for a package
+    leaves = [(counts[character], position) for position, character in enumerate(characters)]
+    items = leaves
+
+    for _ in range(max_length - 1):
+        packages = [
+            (items[i][0] + items[i + 1][0], (items[i], items[i + 1]))
+            for i in range(0, len(items) - 1, 2)]
+        items = list(heapq.merge(leaves, packages, key=lambda item: item[0]))
+
+    # count how many times each character appears in the cheapest 2u-2 items
+    lengths = [0] * len(characters)
+    stack = items[:2 * len(characters) - 2]
+    while stack:
+        count, contents = stack.pop()
+        if isinstance(contents, tuple):
+            stack.extend(contents)
+        else:
+            lengths[contents] += 1
+
+    return dict(zip(characters, lengths))
+
+
+def make_frame(code_lengths, bit_length, payload, binary=False, sync_points=None):
+    """
+    Packs an encoded message into a self-describing frame of bytes, laid out as follows (all numbers big-endian):
+
+    - FRAME_MAGIC (4 bytes) and FRAME_VERSION (1 byte)
+    - flags (1 byte): FLAG_BYTES if the message is bytes rather than text
+    - the longest code length, L (1 byte)
+    - for each length from 1 to L, how many characters have a code of that length (4 bytes each)
+    - the characters, in canonical order (3 bytes each, the character's Unicode code point, or 1 byte each for a bytes message)
+    - the number of bits in the encoded message (8 bytes)
+    - the encoded message itself
+    - only if flags include FLAG_INDEX, a sync point index (see index_size())
+
+    The codes are canonical (see canonical_codes()), so the number of codes of each length and the order of the characters are all that is needed to rebuild them. For a typical English text the table takes less than 300 bytes.
+    """
+    characters_in_order = sorted(code_lengths, key=lambda character: (code_lengths[character], character))
+    longest = max(code_lengths.values(), default=0)
+
+    # how many codes there are of each length
+    counts = [0] * (longest + 1)
+    for length in code_lengths.values():
+        counts[length] += 1
+
+    flags = (FLAG_BYTES if binary else 0) | (FLAG_INDEX if sync_points is not None else 0)
+
+    header = bytearray(FRAME_MAGIC)
+    header += struct.pack(">BBB", FRAME_VERSION, flags, longest)
+    header += struct.pack(f">{longest}I", *counts[1:])
+    if binary:
+        header += bytes(characters_in_order)
+    else:
+        for character in characters_in_order:
+            header += ord(character).to_bytes(3, "big")
+    header += struct.pack(">Q", bit_length)
+
+    if sync_points is None:
+        return bytes(header) + bytes(payload)
+
+    interval, character_count, offsets = sync_points
+    index = INDEX_HEADER.pack(interval, character_count, len(offsets)) + struct.pack(f">{len(offsets)}Q", *offsets)
+    return bytes(header) + bytes(payload) + index
+
+
+def index_size(character_count, interval):
+    """
+    Returns how many bytes a sync point index adds to a frame of 'character_count' characters, with a sync point every 'interval' characters.
+
+    The index is INDEX_HEADER (the interval, the number of characters and the number of sync points: 16 bytes) followed by 8 bytes for every sync point. Sync point k is the bit position where character k * interval starts. Character positions aren't stored, as they are always a multiple of the interval, and the sync point for character 0 is always bit 0, so it isn't stored either.
+    """
+    return INDEX_HEADER.size + 8 * (max(character_count - 1, 0) // interval)
+
+
+def read_frame_header(stream):
+    """
+    Reads the header of a frame made by make_frame() from a binary file-like object, leaving the stream at the start of the encoded message.
+
+    Returns the canonical encoding table, the number of bits in the encoded message, and whether the message is bytes. Raises ValueError if the stream doesn't start with a valid header.
+    """
+
+    def read_exactly(size):
+        data = stream.read(size)
+        if len(data) != size:
+            raise ValueError("Huffman frame is truncated")
+        return data
+
+    if read_exactly(4) != FRAME_MAGIC:
+        raise ValueError("buffer is not a Huffman frame")
+
+    version, flags, longest = struct.unpack(">BBB", read_exactly(3))
+    if version != FRAME_VERSION:
+        raise ValueError(f"unsupported Huffman frame version {version}")
+
+    counts = struct.unpack(f">{longest}I", read_exactly(4 * longest))
+    binary = bool(flags & FLAG_BYTES)
+
+    # the lengths must fit in a prefix code (the Kraft inequality: the sum of 2^-length over every code is at most 1),
+    # or canonical_codes() would give some characters codes that are too long, or that start with another code
+    if sum(count << (longest - length) for length, count in enumerate(counts, start=1)) > 1 << longest:
+        raise ValueError("Huffman frame is corrupt: its code lengths don't make a prefix code")
+    width = 1 if binary else 3
+
+    # rebuild the code lengths, reading the characters in canonical order
+    characters = read_exactly(width * sum(counts))
+    code_lengths = {}
+    position = 0
+    try:
+        for length, count in enumerate(counts, start=1):
+            for _ in range(count):
+                if binary:
+                    code_lengths[characters[position]] = length
+                else:
+                    code_lengths[chr(int.from_bytes(characters[position:position + 3], "big"))] = length
+                position += width
+    except ValueError:
+        raise ValueError("Huffman frame is corrupt") from None
+    if len(code_lengths) != sum(counts):
+        raise ValueError("Huffman frame is corrupt: a character appears more than once")
+
+    bit_length, = struct.unpack(">Q", read_exactly(8))
+
+    return canonical_codes(code_lengths), bit_length, binary
+
+
+def read_frame(buffer):
+    """
+    Reads a frame made by make_frame().
+
+    Returns the canonical encoding table, the number of bits in the encoded message, whether the message is bytes, and a memoryview of the encoded message. Raises ValueError if the buffer isn't a valid frame.
+    """
+    stream = io.BytesIO(buffer)
+    encoding_table, bit_length, binary = read_frame_header(stream)
+
+    start = stream.tell()
+    payload = memoryview(buffer)[start:start + (bit_length + 7) // 8]
+    if len(payload) * 8 < bit_length:
+        raise ValueError("Huffman frame is truncated")
+
+    return encoding_table, bit_length, binary, payload
+
+
+def read_frame_index(buffer):
+    """
+    Reads the sync point index of a frame made with one (see Huffman_encoding_maker's index_interval).
+
+    Returns the interval, the number of characters in the message, and a list of the bit positions where characters 0, interval, 2 * interval and so on start. Raises ValueError if the frame has no index.
+    """
+    stream = io.BytesIO(buffer)
+    bit_length = read_frame_header(stream)[1]
+    if not buffer[FLAGS_OFFSET] & FLAG_INDEX:
+        raise ValueError("Huffman frame has no sync point index")
+
+    # the index starts straight after the encoded message
+    start = stream.tell() + (bit_length + 7) // 8
+    try:
+        interval, character_count, count = INDEX_HEADER.unpack_from(buffer, start)
+        offsets = struct.unpack_from(f">{count}Q", buffer, start + INDEX_HEADER.size)
+    except struct.error:
+        raise ValueError("Huffman frame's sync point index is truncated") from None
+
+    return interval, character_count, [0] + list(offsets)
+
+
+class Huffman_frame_reader:
+    """
+    Random access to a frame that has a sync point index: reader.decode_range(start, stop), or reader[start:stop].
+
+    The header and index are read, and the decoder built, once, when the reader is made. The decoder's look-up table then fills in as it is used, and is kept for every later read, so many small reads from the same frame don't each pay to rebuild it.
+    """
+
+    def __init__(self, buffer):
+        encoding_table, self.bit_length, self.binary, self.payload = read_frame(buffer)
+        self.interval, self.character_count, self.offsets = read_frame_index(buffer)
+        self.decoder = Huffman_decoder(encoding_table, self.binary)
+
+    def __len__(self):
+        return self.character_count
+
+    def __getitem__(self, key):
+        """Decodes a slice of the message (with a step of 1), or a single character."""
+        if isinstance(key, slice):
+            if key.step not in (None, 1):
+                raise ValueError("Huffman_frame_reader only supports slices with a step of 1")
+            return self.decode_range(key.start, key.stop)
+        if key < 0:
+            key += self.character_count
+        if not 0 <= key < self.character_count:
+            raise IndexError("Huffman frame index out of range")
+        return self.decode_range(key, key + 1)
+
+    def decode_range(self, start, stop):
+        """
+        Decodes characters start to stop (not including stop, like a slice).
+
+        Rather than decoding from the start of the message, this jumps to the last sync point at or before 'start', and decodes only from there to 'stop'. So at most interval - 1 unwanted characters are decoded, however far into the message the range is.
+        """
+        start, stop, step = slice(start, stop).indices(self.character_count)
+        if start >= stop:
+            return self.decoder.empty
+
+        sync_point = start // self.interval
+        decoded = self.decoder.decode_from(
+            self.payload, self.offsets[sync_point], self.bit_length, stop - sync_point * self.interval)
+        return decoded[start - sync_point * self.interval:]
+
+
+def decode_range(buffer, start, stop):
+    """
+    Decodes characters start to stop (not including stop, like a slice) of a frame that has a sync point index. See Huffman_frame_reader.decode_range().
+
+    This reads the frame's header and builds a decoder on every call. To read many ranges from one frame, make a Huffman_frame_reader once and use that instead.
+    """
+    return Huffman_frame_reader(buffer).decode_range(start, stop)
+
+
+def decode(buffer):
+    """
+    Decodes a frame made by Huffman_encoding_maker.get_frame() (or make_frame()).
+
+    Everything needed to decode the message is read from the frame's header, so a frame can be stored, or sent to another process, and decoded without the object (or closure) that encoded it.
+    """
+    encoding_table, bit_length, binary, payload = read_frame(buffer)
+    return Huffman_decoder(encoding_table, binary).decode(payload, bit_length)
+
+
+def check_chunk_size(chunk_size):
+    """
+    Raises ValueError unless chunk_size is at least 1.
+
+    read(0) gives nothing back, which the streaming functions would take for the end of the file, so a non-empty file would be compressed into an empty frame. read() of a negative size reads the whole file, which is what streaming is meant to avoid.
+    """
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be at least 1, not {chunk_size}")
+
+
+def positive_int(text):
+    """argparse type for a whole number of at least 1."""
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{text!r} is not a whole number") from None
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {value}")
+    return value
+
+
+def count_characters_in_stream(source, chunk_size=STREAM_CHUNK):
+    """
+    Counts how many times each character appears in a file-like object, reading it 'chunk_size' characters (or bytes) at a time. Raises ValueError if chunk_size is less than 1, as do compress_stream() and decompress_stream().
+
+    Only the counts and one chunk are held in memory, however big the file is. Returns the counts, and whether the file is binary (gave bytes rather than str).
+    """
+    check_chunk_size(chunk_size)
+    counts = Counter()
+    while True:
+        chunk = source.read(chunk_size)
+        binary = is_binary(chunk)
+        if not chunk:
+            return dict(counts), binary
+        counts.update(count_symbols(chunk))
+
+
+def compress_stream(source, destination, chunk_size=STREAM_CHUNK, max_code_length=None):
+    """
+    Compresses a file-like object (text, or binary) into a binary one, without ever holding the whole message in memory.
+
+    The source is read twice. The first pass counts the characters, which is enough to build the codes and to work out how many bits the encoded message will take. That means the header of the frame can be written before any of the message is encoded. The second pass encodes the source one chunk at a time, writing the packed bytes out as it goes.
+
+    The output is exactly the same frame that Huffman_encoding_maker.get_frame() would make for the whole message, so it can be read by decode() as well as decompress_stream(). The source must be seekable. max_code_length is passed on to Huffman_encoding_maker.
+
+    Returns the number of bytes written.
+    """
+    check_chunk_size(chunk_size)
+    start = source.tell()
+
+    # first pass: count the characters, and build the codes from the counts
+    counts, binary = count_characters_in_stream(source, chunk_size)
+    maker = Huffman_encoding_maker(counts=counts, binary=binary, max_code_length=max_code_length)
+    written = destination.write(make_frame(maker.code_lengths, maker.bit_length, b"", binary))
+
+    # second pass: encode
+    source.seek(start)
+    chunks = iter(lambda: source.read(chunk_size) or None, None)
+    for encoded in maker.encode_chunks(chunks):
+        written += destination.write(encoded)
+
+    return written
+
+
+def decompress_stream(source, destination, chunk_size=STREAM_CHUNK):
+    """
+    Decompresses a frame from a binary file-like object, 'chunk_size' bytes at a time. The destination must be a text file-like object for text frames, and a binary one for bytes frames.
+
+    The header is read first, to rebuild the decoder. After that, each chunk of the encoded message is decoded and written out before the next one is read. The decoder's state is carried from one chunk to the next, so codes that cross the edge of a chunk are decoded correctly.
+
+    Returns the number of characters written.
+    """
+    check_chunk_size(chunk_size)
+    encoding_table, bit_length, binary = read_frame_header(source)
+    decoder = Huffman_decoder(encoding_table, binary)
+    state = 0
+    written = 0
+
+    # decode whole bytes, a chunk at a time
+    remaining = bit_length
+    while remaining >= 8:
+        chunk = source.read(min(chunk_size, remaining >> 3))
+        if not chunk:
+            raise ValueError("Huffman frame is truncated")
+        characters, state = decoder.feed(chunk, state)
+        written += destination.write(characters)
+        remaining -= 8 * len(chunk)
+
+    # decode the bits at the start of the final byte
+    if remaining:
+        final = source.read(1)
+        if not final:
+            raise ValueError("Huffman frame is truncated")
+        characters, state = decoder.walk(state, final[0] >> (8 - remaining), remaining)
+        written += destination.write(characters)
+
+    if state != 0:
+        raise ValueError("encoded message ends part way through a code")
+
+    return written
+
+
+class Huffman_array_tree:
+    """
+    A Huffman tree kept in typed arrays, rather than as a Huffman_Node object for every node.
+
+    The nodes are numbered in the order they are made. Nodes 0 to u-1 are the leaves, one for each character (in the order of the counts dictionary). Nodes u to 2u-2 are the combined nodes, and the last one made is the root. For combined node i, left[i - u] and right[i - u] are the numbers of its children, and weight[i] is the count of every node.
+
+    A node object costs around 100 bytes; here each node costs 8 bytes of weight, plus 8 bytes of children for combined nodes. The tree is built with the same heap as Huffman_encoding_maker, and a node's number is also its tie-break order, so it has exactly the same shape as the node tree.
+
+    Because a combined node is always made after its children, it always has a higher number than they do. So the depth of every node (which is the length of its code) can be found in a single loop from the root down to node 0, with no recursion and no stack.
+    """
+
+    def __init__(self, counts):
+        # the character of each leaf
+        self.characters = list(counts)
+        leaf_count = len(self.characters)
+
+        self.weight = array("q", counts.values())
+        self.left = array("l")
+        self.right = array("l")
+
+        # the heap holds (count, node number) pairs
+        heap = [(count, leaf) for leaf, count in enumerate(self.weight)]
+        heapq.heapify(heap)
+
+        while len(heap) > 1:
+            first_count, first = heapq.heappop(heap)
+            second_count, second = heapq.heappop(heap)
+
+            # the combined node's number is the next one along
+            combined = len(self.weight)
+            self.left.append(first)
+            self.right.append(second)
+            self.weight.append(first_count + second_count)
+            heapq.heappush(heap, (first_count + second_count, combined))
+
+        self.leaf_count = leaf_count
+        self.root = len(self.weight) - 1 if leaf_count else None
+
+    def get_code_lengths(self):
+        """
+        Returns a dictionary of character: code length. A message with only one unique character gives it a 1 bit code.
+
+        Complexity is O(u), with one pass over the combined nodes from the root down.
+        """
+        if self.leaf_count <= 1:
+            return {character: 1 for character in self.characters}
+
+        depth = array("l", bytes(array("l").itemsize * len(self.weight)))
+        for node in range(self.root, self.leaf_count - 1, -1):
+            child_depth = depth[node] + 1
+            depth[self.left[node - self.leaf_count]] = child_depth
+            depth[self.right[node - self.leaf_count]] = child_depth
+
+        return dict(zip(self.characters, depth))
+
+    def to_nodes(self):
+        """
+        Returns the same tree as Huffman_encoding_maker.Huffman_Node objects (the root node), for code that wants to inspect the nodes. Codes are numbered 0 (left) and 1 (right), as in Huffman_encoding_maker.
+        """
+        if self.root is None:
+            return None
+
+        nodes = [
+            Huffman_encoding_maker.Huffman_Node(character, count)
+            for character, count in zip(self.characters, self.weight)]
+        for position, (left, right) in enumerate(zip(self.left, self.right)):
+            nodes[left].code = 0
+            nodes[right].code = 1
+            nodes.append(Huffman_encoding_maker.Huffman_Node(
+                None, self.weight[self.leaf_count + position], nodes[left], nodes[right]))
+
+        root = nodes[self.root]
+        root.code = "" if root.character is None else "0"
+        return root
 
 
 class Huffman_encoding_maker:
@@ -27,16 +820,20 @@ class Huffman_encoding_maker:
     """
 
     class Huffman_Node:
+
+        # __slots__ stops each node carrying a __dict__, which roughly halves the memory each node takes
+        __slots__ = ("character", "count", "left", "right", "code")
+
         def __init__(
             self, character, count, left=None, right=None, code=None):
             """
             This is the foundational structure for this encoding. It sets up a binary tree node. 
             """
 
-            # the character(s) to be encoded
+            # the character to be encoded (None for combined nodes)
             self.character = character
             
-            # how often that character(s) appears in the message
+            # how often that character (or the characters below this node) appears in the message
             self.count = count
 
             # define child nodes (None, by default)
@@ -48,24 +845,18 @@ class Huffman_encoding_maker:
 
 
     def __count_of_characters_in_(self, string):
-        """This function runs through a string and makes a dictionary with a count of how often each character appears within it.
+        """This function runs through a string (or bytes) and makes a dictionary with a count of how often each character appears within it.
 
-        The function makes one comparrison for every character in the string. In terms of comparsion, this is a complexity of O(n).
+        The counting itself is done by count_symbols(). An earlier version looped over the string in Python, doing two dictionary look-ups per character. count_symbols() does the same O(n) work inside C code (collections.Counter), or as a single vectorised NumPy pass for bytes."""
 
-        Each comparison involves reference to two different structures. If (n = length of input) and (u = unique characters in input), the worst case complexity for lookup is O(nu), because for each character in the string it must be checked against each unique character in the character count dictionary."""
-
-        character_dict = {}
-        for character in string:
-            if character_dict.get(character) != None:
-                character_dict[character] += 1
-            else:
-                character_dict[character] = 1
-        return character_dict
+        return count_symbols(string)
 
     def __list_of_nodes_from_counts(self):
         """
-        Takes the dictionary of character counts and transforms it into a list of Node objects ordered by the count value of each character
-        
+        Takes the dictionary of character counts and transforms it into a list of leaf Node objects, one for each unique character.
+
+        The list keeps the order of the counts dictionary (the order in which characters first appear in the message). That order is what makes tie-breaks in __place_nodes_in_tree deterministic: two runs over the same message always build the same tree.
+
         Complexity is O(u), where u = total unique characters, as one node is made for each.
         """
         
@@ -83,57 +874,104 @@ class Huffman_encoding_maker:
         #returns complete list of nodes
         return nodes
 
+    def __counts_are_sorted(self):
+        """
+        Checks whether the leaf nodes are already in ascending order of count. This is a single O(u) pass.
+        """
+        for i in range(1, len(self.nodes)):
+            if self.nodes[i - 1].count > self.nodes[i].count:
+                return False
+        return True
+
+    def __combine(self, first, second):
+        """
+        Makes a parent node for the two nodes passed in. The first node is coded as 0 and the second as 1.
+
+        The parent does not carry the concatenated characters of its children. Its character is None, which is how get_codes_from_tree tells internal nodes from leaves. Without this every internal node held a copy of all the characters beneath it, so the memory used by the tree grew with u^2.
+        """
+        first.code = 0
+        second.code = 1
+        return self.Huffman_Node(None, first.count + second.count, first, second)
+
+    def __place_nodes_in_tree_with_heap(self):
+        """
+        Builds the tree using a binary heap as a priority queue (Python's heapq module).
+
+        Each heap entry is (count, order, node). 'order' is a counter that goes up by one for every node pushed. When two counts are equal the node that was pushed first wins, so the tie-break is deterministic, and the node objects themselves never have to be compared.
+
+        There are u-1 merges, and each one does two pops and a push at O(log u) each, so complexity is O(u log u). The original version re-sorted the whole list before every merge, which was O(u^2 log u).
+        """
+        heap = [(node.count, order, node) for order, node in enumerate(self.nodes)]
+        heapq.heapify(heap)
+        order = len(heap)
+
+        while len(heap) > 1:
+
+            # take the two least frequent nodes
+            first = heapq.heappop(heap)[2]
+            second = heapq.heappop(heap)[2]
+
+            # put the node that combines them back onto the heap
+            combined_node = self.__combine(first, second)
+            heapq.heappush(heap, (combined_node.count, order, combined_node))
+            order += 1
+
+        return heap[0][2]
+
+    def __place_nodes_in_tree_with_two_queues(self):
+        """
+        Builds the tree in O(u) time, using two queues. This only works if the leaves are already sorted by count.
+
+        The first queue holds the sorted leaves. The second holds combined nodes. Combined nodes are made in ascending order of count, so the second queue stays sorted without any extra work. The two smallest nodes are always found at the front of one of the two queues.
+
+        Ties are broken in favour of the leaf queue, which keeps the result deterministic.
+        """
+        leaves = deque(self.nodes)
+        combined = deque()
+
+        def pop_smallest():
+            # take from the leaf queue unless the combined queue has a strictly smaller count
+            if not combined or (leaves and leaves[0].count <= combined[0].count):
+                return leaves.popleft()
+            return combined.popleft()
+
+        while len(leaves) + len(combined) > 1:
+            first = pop_smallest()
+            second = pop_smallest()
+            combined.append(self.__combine(first, second))
+
+        return (leaves or combined)[0]
+
     def __place_nodes_in_tree(self):
         """
         Organises the list of nodes into a binary tree structure according to principles of Huffman encoding. 
-        
-        This function will be called 2u-1 times, because a binary tree with u leaf nodes has (by definition) at most 2u-1 nodes total.
-        
-        Each call to the function involves calling sorted(). Sorted() uses the Timsort algorithm, which has a worst case O(u log u).
 
-        This means complexity for this function exceeds O(n^2). This isn't ideal. But as huffman encoding requires both a binary tree, and re-sort of the originating list before each node is made, there is little scope for improvement.
-
-        Again, as the maximum value of u in this encoding is 127, this was considered adequate.
+        Huffman's algorithm repeatedly merges the two least frequent nodes. The original version of this function found them by calling sorted() on the whole list before every merge, which made tree building the slowest part of the program on large alphabets (eg full Unicode text).
 
+        If the counts are already in ascending order the O(u) two-queue method is used. Otherwise a heap is used, at O(u log u).
         """
-        
-        while len(self.nodes) > 1:
-            
-            # sort nodes by count of occurences in original message
-            self.nodes = sorted(self.nodes, key=lambda x:x.count)
 
-            # code two least frequent letter nodes to 0 and 1
-            self.nodes[0].code = 0
-            self.nodes[1].code = 1
-        
-            # create a parent node to represent the two nodes combined
-            combined_node = self.Huffman_Node(
-                
-                # combine details of child nodes to create parent node
-                self.nodes[0].character + self.nodes[1].character,
-                self.nodes[0].count + self.nodes[1].count,
-                
-                # point parent node to two child nodes
-                self.nodes[0],
-                self.nodes[1],
-            )        
-            
-            # remove two smallest nodes from list structure
-            self.nodes.pop(1)
-            self.nodes.pop(0)
+        # an empty message has no tree at all
+        if not self.nodes:
+            self.nodes = None
+            return
 
-            # add combined node in their place
-            self.nodes.append(combined_node)
-        
-        # when only the root node remains in the list, replace list with root node
-        self.nodes = self.nodes[0]
-        
-        #root node is coded as 1 because Python strips leading 0s in binary
-        self.nodes.code = "1"
+        if self.__counts_are_sorted():
+            root = self.__place_nodes_in_tree_with_two_queues()
+        else:
+            root = self.__place_nodes_in_tree_with_heap()
+
+        # when only the root node remains, replace list with root node
+        self.nodes = root
+
+        # the root node adds nothing to the codes below it. The encoded message
+        # keeps an explicit bit length, so codes are free to start with 0.
+        # A message with only one unique character still needs one bit per character.
+        self.nodes.code = "" if root.character is None else "0"
 
     def get_codes_from_tree(self, node=None, code=""):
         """
-        This module is called recursively to generate codes by traversing the tree that's been made.
+        This module generates codes by traversing the tree that's been made, from 'node' downwards.
         It stores the codes generated in the class' "encoding table" attribute, which is a Python dictionary.
         
         I chose to represent the encoding table as a dictionary, rather than a tree, because built in types will be more familiar to anyone else who needs to maintain this code. The syntax for travering and reordering dictionaries is also simpler.
@@ -143,30 +981,154 @@ class Huffman_encoding_maker:
         Though using a tree to encode, and a table to decode does increase memory needs of the program, I decided this was worth it to make the code more maintainable. Also, as the maximum size of this table is 127 this felt like a small ask of most modern processors.
 
         This function has a complexity of O(2u-1), because that is how many nodes it will have to check in total.
+
+        The traversal uses a list as a stack, rather than recursion. An earlier version called itself for every node, so a deep tree (which very uneven counts can make, up to u-1 levels deep) could go past Python's recursion limit.
         """
 
         # if no Node is specified, start from the root node
         if node == None:
             node = self.nodes
+
+            # an empty message has no codes
+            if node == None:
+                return
         
         # if this isn't the root node, combine the code of this node with its ancestor nodes' codes
         else:
             node.code = code + str(node.code)
 
-        #if this is a 'combined' node, representing several characters, go further along the branch
-        if len(node.character) != 1:
-            if node.left != None:
-                self.get_codes_from_tree(node.left, node.code)
-            if node.right != None:
-                self.get_codes_from_tree(node.right, node.code)
-        
-        #if this is a single character node, set the characters code
-        else:
-            self.encoding_table[node.character] = node.code
+        # nodes still to visit, whose codes are already complete
+        stack = [node]
+        while stack:
+            node = stack.pop()
+
+            #if this is a 'combined' node (which has no character of its own), go further along the branch
+            if node.character is None:
+                for child in (node.right, node.left):
+                    if child != None:
+                        child.code = node.code + str(child.code)
+                        stack.append(child)
+
+            #if this is a single character node, set the characters code
+            else:
+                self.encoding_table[node.character] = node.code
     
+    def __get_code_lengths(self):
+        """
+        Returns a dictionary of character: length of that character's code, read from the codes found in the tree.
+
+        The lengths are all that canonical_codes() needs, and all that a frame has to store.
+        """
+        return {character: len(code) for character, code in self.encoding_table.items()}
+
+    def __bits_needed(self):
+        """Returns how many bits the message takes with the current code lengths: the sum of count * code length over every character."""
+        return sum(count * self.code_lengths[character] for character, count in self.counts.items())
+
+    def __byte_code_tables(self):
+        """
+        Builds the tables used by the ASCII/byte fast path of encode().
+
+        The first table is a list of 256 code strings, indexed by byte value. The second holds the codes for every possible pair of bytes, indexed the same way a memoryview cast to unsigned 16 bit integers reads them. That halves the number of look-ups needed to encode a message.
+
+        Returns None if any character in the encoding table doesn't fit in a single byte. Bytes that aren't in the encoding table are None in both tables, so a message containing one fails to join, rather than losing the character (see __missing_character()).
+        """
+        single = [None] * 256
+        for character, code in self.encoding_table.items():
+            byte = character if self.binary else ord(character)
+            if byte > 255:
+                return None
+            single[byte] = code
+
+        # the memoryview reads pairs of bytes in the machine's native byte order
+        def pair(first, second):
+            return None if first is None or second is None else first + second
+
+        if sys.byteorder == "little":
+            pairs = [pair(first, second) for second in single for first in single]
+        else:
+            pairs = [pair(first, second) for first in single for second in single]
+
+        return single, pairs
+
+    def __code_strings(self, string):
+        """
+        Generator that yields the encoded message as a series of strings of 0s and 1s, one for each chunk of ENCODE_CHUNK characters.
+
+        Each chunk is encoded with a single join over a table look-up per character, which all happens inside the C code of the interpreter. Bytes messages, and text made only of characters that fit in one byte, take the fast path: the chunk is looked up as bytes, two bytes at a time.
+        """
+        if self.binary:
+            string = memoryview(string).cast("B")
+
+        # the tables take a 65536 entry list, so they are only built for long messages, and only once per object
+        byte_tables = None
+        if len(string) >= ENCODE_CHUNK:
+            if not self.byte_tables_built:
+                self.byte_tables = self.__byte_code_tables()
+                self.byte_tables_built = True
+            byte_tables = self.byte_tables
+
+        # general path: one dictionary look-up per character
+        if byte_tables is None:
+            lookup = self.encoding_table.__getitem__
+            for start in range(0, len(string), ENCODE_CHUNK):
+                yield "".join(map(lookup, string[start:start + ENCODE_CHUNK]))
+            return
+
+        # fast path: one list look-up per pair of bytes
+        single, pairs = byte_tables
+        for start in range(0, len(string), ENCODE_CHUNK):
+            if self.binary:
+                chunk = bytes(string[start:start + ENCODE_CHUNK])
+            else:
+                try:
+                    chunk = string[start:start + ENCODE_CHUNK].encode("latin-1")
+                except UnicodeEncodeError:
+                    self.__missing_character(string[start:start + ENCODE_CHUNK])
+
+            # ENCODE_CHUNK is even, so only the final chunk can have a byte left over
+            even = len(chunk) & ~1
+            try:
+                bits = "".join(map(pairs.__getitem__, memoryview(chunk[:even]).cast("H")))
+            except TypeError:
+                self.__missing_character(string[start:start + ENCODE_CHUNK])
+            yield bits
+            if even != len(chunk):
+                if single[chunk[-1]] is None:
+                    self.__missing_character(string[start + even:])
+                yield single[chunk[-1]]
+
+    def __missing_character(self, chunk):
+        """
+        Raises KeyError for the first character of 'chunk' that isn't in the encoding table, as a dictionary look-up on the general path of __code_strings() would.
+
+        The fast path only finds out that a chunk has such a character when it fails to join the codes, so the chunk is searched again here to say which one.
+        """
+        for character in chunk:
+            if character not in self.encoding_table:
+                raise KeyError(character)
+        raise AssertionError("chunk has no character missing from the encoding table")
+
+    def __get_sync_points(self, string):
+        """
+        Returns the bit position of every index_interval'th character in the encoded message, not counting character 0 (see index_size()).
+
+        The position of each sync point is found by adding up the code lengths of the characters in the interval before it. Each interval is added up with a single sum() over a map(), so this is another O(n) pass done in C.
+        """
+        if self.binary:
+            string = memoryview(string).cast("B")
+        length_of = self.code_lengths.__getitem__
+
+        offsets = []
+        position = 0
+        for start in range(0, len(string) - self.index_interval, self.index_interval):
+            position += sum(map(length_of, string[start:start + self.index_interval]))
+            offsets.append(position)
+        return offsets
+
     def encode(self, string):
         """
-        Uses the encoding table to translate the original string into a Huffman encoded string
+        Uses the encoding table to translate the original string into Huffman encoded bytes.
 
         The endoding table is a dict, Python's implementation of a hash table. Look-up in hash tables has constant time, or O(1).
 
@@ -175,112 +1137,206 @@ class Huffman_encoding_maker:
         Using a hash table means the complexity of encoding the entire length of the input string (n) is only O(n).
         If I had used a binary tree, complexity would be between O(log(u) * n) and O(un).
 
-        int() is used to cast the generated string into binary, as without this the generated string would actually be several times larger than the message it was intended to compress. The syntax int(string, 2) just means 'read this string as if it was a binary code'.
+        The message is read once, from start to end, and packed into a Bit_writer as it goes. An earlier version called string.replace() once for every entry in the table, which was O(nu), and garbled any message that contained the characters 0 or 1.
+
+        The number of bits used is stored in self.bit_length. The final byte is padded with 0s, so without the bit length a decoder couldn't tell padding from data. Leading 0 bits are kept, which casting the codes to a single int did not do.
         """
-        # Change each character into the encoded version of itself.
-        for character in self.encoding_table:
-            string = string.replace(character, self.encoding_table[character])
-        
-        # Transform encoded string into actual binary
-        string = int(string, 2)
-        
-        return string
-    
+        encoded, self.bit_length = self.encode_with_length(string)
+
+        # note where every index_interval'th character starts, if asked to
+        if self.index_interval is not None:
+            # a memoryview of wider items (such as an array of 16 bit ints) is still encoded a byte at a time
+            character_count = len(memoryview(string).cast("B")) if self.binary else len(string)
+            self.sync_points = (self.index_interval, character_count, self.__get_sync_points(string))
+
+        return encoded
+
+    def encode_with_length(self, string):
+        """
+        Returns the encoded bytes of 'string' and the number of bits used, without storing anything on this object.
+
+        encode() keeps the bit length (and any sync points) in attributes, so two threads encoding with the same object at once could each read the other's. This doesn't, so one object (such as a shared codebook's) can be used by many threads.
+        """
+        writer = Bit_writer()
+
+        # encode the message one chunk at a time, and pack each chunk into bytes
+        for bits in self.__code_strings(string):
+            writer.write_bits(bits)
+
+        return writer.getvalue(), writer.bit_length
+
+    def encode_chunks(self, chunks):
+        """
+        Generator that encodes a message handed over as a series of chunks (any iterable of strings), and yields the encoded bytes as soon as they are ready.
+
+        Only one chunk, and less than a byte of leftover bits, is held at a time, so the message can be of any size. The final yield includes the padded last byte.
+        """
+        writer = Bit_writer()
+        for chunk in chunks:
+            for bits in self.__code_strings(chunk):
+                writer.write_bits(bits)
+            yield writer.take()
+        yield writer.getvalue()
+
     def get_decoding_function(self):
         """
-        Returns a encoding function designed specifically for the message being sent.
+        Returns a decoding function designed specifically for the message being sent.
         This means that the decoding function can be sent as a part of the message being sent.
         It also means that the recipient doesn't have to have the full code of the encoding function.
 
-        Complexity is O(1), as the same objects are referenced and returned no matter what the input string was.
+        The function returned is the decode() method of a Huffman_decoder built from this object's encoding table. It takes the encoded bytes and their bit length.
+
+        Complexity is O(u), to build the decoder's code tree. The decoder's look-up table is filled in as it is used.
         """
-        
-        # declare encoding table within parent scope of nested "decoding_function"
-        # keys/values are swapped so we can take advantage of the constant time of a dictionary lookup in decoding too
-        encoding_table = {value:key for key, value in self.encoding_table.items()}
-        
-        def decoding_function(encoded):
-            """Decodes a message using the table in the enclosing scope of the "get" method. Calls its subfunction once for every letter of the original message. Complexity is O(n)"""
-            
-            # turn integer representation of binary back into actual binary
-            string = bin(encoded)
-            
-            # remove leading "0b" of Python's binary representation
-            string = string[2:]
-            
-            # create empty string to hold decoded message
-            decoded_string = ""
-
-            def decode_next_letter(string):
-                """
-                Finds the shortest sequence from the begining of the string that matches an entry in the encoding table.
-
-                Because I have used a hash table, not a tree, each look-up is in constant time, ie O(1). Complexity for this entire function is O(e), (where e is the length of the encoded string) because for every position in the encoded string, the algorithm searches the dictionary of keys and codes. Using a tree, complexity would have altered depending on how many unique letters were in the message (u). Best case scenario with a tree would have been O(e log(u)).
-
-                The combined complexity of this function and its enclosing function is also O(e), as each position in the encoded string is considered only once. 
-
-                """
-                
-                # Works through possible lengths for first character code
-                for i in range(len(string)+1):
-                    
-                    # defines code as 'first i letters' of string
-                    code = string[0:i]
-                    
-                    # check if that code is in the encoding table
-                    if code in encoding_table:
-                        return code, encoding_table[code]
-                    else:
-                        pass
-            
+        return Huffman_decoder(self.encoding_table, self.binary).decode
 
-            # decode the letters of the string until there are no more letters
-            while len(string) > 0:
-                
-                #call decode function
-                code, key = decode_next_letter(string)
-                
-                # add decoded character to decoded string
-                decoded_string = decoded_string + key
-
-                # remove decoded code from string
-                string = string.replace(code, "", 1)
-            
-            return decoded_string
+    def get_frame(self):
+        """
+        Returns the encoded message as a self-describing frame of bytes (see make_frame()). The frame can be decoded by the module level decode() function, with nothing else needed.
+        """
+        return make_frame(self.code_lengths, self.bit_length, self.encoded_string, self.binary, self.sync_points)
 
-        # return unique decoding function 
-        return decoding_function
+    def __init__(self, string=None, counts=None, binary=False, max_code_length=None, index_interval=None, compact_tree=False):
+        """
+        Either the string to encode, or a dictionary of character counts, must be given.
 
+        The string can also be bytes, a bytearray, a memoryview or an mmap, in which case the 'characters' are the 256 byte values and decoding gives bytes back. When only counts are given, 'binary' says which kind of message they were counted from.
 
-    def __init__(self, string):
+        If only the counts are given (for example when they have been counted from a file, a chunk at a time) the codes are built but nothing is encoded. encoded_string is then None, and bit_length is the number of bits the message will take. encode_chunks() can then be used to encode the message.
 
-        # count the occurences of each character in the string
-        self.counts = self.__count_of_characters_in_(string)
-        
-        # create a list of nodes using the counts just done
-        self.nodes = self.__list_of_nodes_from_counts()
+        If compact_tree is True, the tree is built as a Huffman_array_tree (kept in self.tree) instead of Huffman_Node objects, and the code lengths are read straight from it. This uses much less memory, and is quicker, for large alphabets. self.nodes is then None; self.tree.to_nodes() gives the same tree as nodes for anything that wants to inspect it.
+
+        If index_interval is given, the frame made by get_frame() includes a sync point every index_interval characters, so that decode_range() can decode any part of the message without starting from the beginning. index_size is how many bytes that index adds. A smaller interval makes decode_range() quicker, at the cost of a bigger index.
+
+        If max_code_length is given, and the tree has codes longer than that, the code lengths are worked out again with length_limited_code_lengths(). The tree in self.nodes is left as it was. unlimited_bit_length is how many bits the message would have taken without the limit, and length_limit_cost is how much bigger (as a fraction) the limit made it.
+        """
+
+        # is this a bytes message?
+        if string is not None:
+            binary = is_binary(string)
+        self.binary = binary
+
+        # sync points are only worked out if an interval is given
+        if index_interval is not None and index_interval < 1:
+            raise ValueError("index_interval must be at least 1")
+        self.index_interval = index_interval
+        self.sync_points = None
+
+        # count the occurences of each character in the string, unless the counts have been given
+        if counts is None:
+            counts = self.__count_of_characters_in_(string)
+        self.counts = counts
         
-        # reorganise list into a tree structure
-        self.__place_nodes_in_tree()
+        if compact_tree:
+
+            # build the tree in arrays, and read the code lengths straight from it
+            self.tree = Huffman_array_tree(self.counts)
+            self.nodes = None
+            self.code_lengths = self.tree.get_code_lengths()
+
+        else:
+            self.tree = None
+
+            # create a list of nodes using the counts just done
+            self.nodes = self.__list_of_nodes_from_counts()
+
+            # reorganise list into a tree structure
+            self.__place_nodes_in_tree()
+
+            # Create empty dictionary to hold character/code information
+            self.encoding_table = {}
+
+            # Traverse tree to get codes, place them into the empty dictionary 
+            self.get_codes_from_tree()
+
+            # keep only the length of each code
+            self.code_lengths = self.__get_code_lengths()
+
+        self.unlimited_bit_length = self.__bits_needed()
 
-        # Create empty dictionary to hold character/code information
-        self.encoding_table = {}
+        # if any code is too long, work the lengths out again with a limit
+        if max_code_length is not None and max(self.code_lengths.values(), default=0) > max_code_length:
+            self.code_lengths = length_limited_code_lengths(self.counts, max_code_length)
+        self.length_limit_cost = self.__bits_needed() / self.unlimited_bit_length - 1 if self.unlimited_bit_length else 0.0
 
-        # Traverse tree to get codes, place them into the empty dictionary 
-        self.get_codes_from_tree()
+        # swap the codes for canonical codes of the same lengths
+        self.encoding_table = canonical_codes(self.code_lengths)
 
-        # encode string using those codes
-        self.encoded_string = self.encode(string)
+        # tables for the byte fast path of encode(), built the first time a long enough message is encoded
+        self.byte_tables = None
+        self.byte_tables_built = False
+
+        # encode string using those codes (this also sets self.bit_length)
+        if string is not None:
+            self.encoded_string = self.encode(string)
+        else:
+            self.encoded_string = None
+            self.bit_length = self.__bits_needed()
 
         # get decoding function unique to the encoding message
         self.decoding_function = self.get_decoding_function()
+
+        # how many bytes the sync point index adds to the frame
+        self.index_size = 0
+        if self.sync_points is not None:
+            self.index_size = index_size(self.sync_points[1], self.index_interval)
     
+def main(arguments=None):
+    """
+    Command line entry point:
+
+        python -m wk9_huffman compress <input> <output>
+        python -m wk9_huffman decompress <input> <output>
+
+    Text files are read and written as UTF-8, with line endings left as they are. With --binary the input is compressed as raw bytes, so any file can be compressed. Decompression works out from the frame which kind it holds.
+    """
+    parser = argparse.ArgumentParser(prog="wk9_huffman", description="Huffman compress or decompress a text file.")
+    parser.add_argument("command", choices=("compress", "decompress"))
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--chunk-size", type=positive_int, default=STREAM_CHUNK, help="characters or bytes read at a time")
+    parser.add_argument("--binary", action="store_true", help="compress the input as bytes rather than UTF-8 text")
+    parser.add_argument("--max-code-length", type=int, default=None, help="longest code allowed, in bits")
+    options = parser.parse_args(arguments)
+
+    try:
+        if options.command == "compress":
+            if options.binary:
+                source = open(options.input, "rb")
+            else:
+                source = open(options.input, encoding="utf-8", newline="")
+            with source, open(options.output, "wb") as destination:
+                compress_stream(source, destination, options.chunk_size, options.max_code_length)
+        else:
+            with open(options.input, "rb") as source:
+
+                # read the header to see if the frame holds text or bytes, then go back to the start
+                binary = read_frame_header(source)[2]
+                source.seek(0)
+
+                if binary:
+                    destination = open(options.output, "wb")
+                else:
+                    destination = open(options.output, "w", encoding="utf-8", newline="")
+                with destination:
+                    decompress_stream(source, destination, options.chunk_size)
+    except (OSError, ValueError) as error:
+        print(f"wk9_huffman: {error}", file=sys.stderr)
+        return 1
+
+    return 0
+
+
 # I've written the above class with the assumption that it would be used as a module as a part of larger projects. 
 # However, if the file is ran on its own, the program will run tests.
+# If it is given a command (see main()), it compresses or decompresses a file instead.
 # These tests are explained below:
        
 if __name__ == "__main__":
 
+  if len(sys.argv) > 1:
+      sys.exit(main())
+
   samples = (
       "There is a spectre haunting europe, the spectre of communism.",
       "The worker must have bread, but she must have roses, too.",
@@ -299,11 +1355,15 @@ if __name__ == "__main__":
         decoder = h.decoding_function
 
         # decode encoded string
-        decoded = decoder(encoded)
+        decoded = decoder(encoded, h.bit_length)
+
+        # pack the encoded message into a frame, and check it decodes on its own
+        frame = h.get_frame()
+        assert decode(frame) == sample
 
         # get size of encoded and unencoded messages, for comparisson.
-        size_of_sample = getsizeof(sample)
-        size_of_encoded = getsizeof(encoded)
+        size_of_sample = len(sample.encode("utf-8"))
+        size_of_encoded = len(encoded)
         
         # print information to CLI
         print("\n-----------------------------------------")
@@ -312,8 +1372,8 @@ if __name__ == "__main__":
         print(f"\n The encoding table looks like:")
         for key, value in h.encoding_table.items():
             print(key + " : " + value)
-        print("\nThe encoded binary (read as an int, to save space on the terminal) reads:")
-        print(encoded)
+        print(f"\nThe encoded binary ({h.bit_length} bits, shown as hex to save space on the terminal) reads:")
+        print(encoded.hex())
         print("\nAfter decoding it reads:")
         print(decoded)
         print(
@@ -321,4 +1381,61 @@ if __name__ == "__main__":
             f"after encoding it is {size_of_encoded} bytes.")
         print(
             "The ratio of original:encoded is " \
-            f"1:{round(size_of_encoded/size_of_sample, 2)}\n")
+            f"1:{round(size_of_encoded/size_of_sample, 2)}")
+        print(
+            f"As a self-describing frame, including its code table, it is {len(frame)} bytes.\n")
+
+  # bytes are encoded the same way, with the 256 byte values as the alphabet
+  binary_sample = bytes(range(256)) + b"\x00" * 1000 + b"\xff" * 100
+  h = Huffman_encoding_maker(binary_sample)
+  print("-----------------------------------------")
+  print(
+      f"\nA {len(binary_sample)} byte binary sample encodes to {len(h.encoded_string)} bytes, " \
+      f"and decodes correctly: {decode(h.get_frame()) == binary_sample}\n")
+
+  # a frame whose header claims three 1 bit codes can't be a prefix code, and is refused rather than decoded wrongly
+  corrupt = FRAME_MAGIC + struct.pack(">BBBI", FRAME_VERSION, 0, 1, 3) + b"\x00\x00a\x00\x00b\x00\x00c" + struct.pack(">Q", 8) + b"\x00"
+  try:
+      decode(corrupt)
+  except ValueError as error:
+      print(f"A frame with impossible code lengths is refused: {error}\n")
+  else:
+      raise AssertionError("a frame with impossible code lengths was decoded")
+
+  # a very large alphabet decodes with a table of bounded size (see Huffman_decoder)
+  import random
+  import time
+  import tracemalloc
+
+  generator = random.Random(0)
+  alphabet = [chr(0x4E00 + position) for position in range(20000)]
+  large_sample = "".join(generator.choices(alphabet, weights=[1 / (rank + 1) for rank in range(len(alphabet))], k=100000))
+  frame = Huffman_encoding_maker(large_sample).get_frame()
+  tracemalloc.start()
+  start = time.perf_counter()
+  decoded = decode(frame)
+  seconds = time.perf_counter() - start
+  peak = tracemalloc.get_traced_memory()[1]
+  tracemalloc.stop()
+  assert decoded == large_sample
+  assert peak < 64 * 1000000, f"decoding a 20,000 character alphabet peaked at {peak / 1000000:.0f} MB"
+  print(f"100,000 characters from a 20,000 character alphabet decode in {seconds:.2f} s, peaking at {peak / 1000000:.0f} MB\n")
+
+  # a chunk size of 0 would read nothing and write an empty frame, so it is refused, by the functions and the command line
+  try:
+      compress_stream(io.StringIO(binary_sample.hex()), io.BytesIO(), chunk_size=0)
+  except ValueError:
+      pass
+  else:
+      raise AssertionError("compress_stream() accepted a chunk size of 0")
+  import contextlib
+
+  try:
+      # argparse prints its usage message before exiting; it isn't needed here
+      with contextlib.redirect_stderr(io.StringIO()):
+          main(["compress", "--chunk-size", "0", "unused.txt", "unused.huf"])
+  except SystemExit as error:
+      assert error.code == 2
+  else:
+      raise AssertionError("the command line accepted a chunk size of 0")
+  print("A chunk size of 0 is refused")
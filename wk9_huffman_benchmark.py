@@ -0,0 +1,350 @@
+"""
+Benchmarks for wk9_huffman.
+
+Running this file builds test messages ('corpora') of several kinds and sizes, and for each one measures:
+
+- build: counting the characters and building the tree and code table
+- encode: turning the message into Huffman encoded bytes
+- decode: turning those bytes back into the message, with Huffman_decoder
+- the peak memory each of those steps allocates (measured with tracemalloc, in a separate run, as tracing slows Python down)
+- the true compressed size: the whole frame, as written by get_frame(), including its code table
+
+Each step is timed REPEAT times (or --repeat times), and the quickest time is kept. The same message is also compressed with zlib, bz2 and lzma from the standard library, so the Huffman results can be compared with them.
+
+There are four kinds of corpus, all generated locally from a fixed seed, so every run gets exactly the same messages:
+
+- text: letters, digits and punctuation, weighted so some are far more common than others, like in real text (a str)
+- skewed: bytes whose values are very unevenly spread, with byte value i roughly 0.8 times as common as value i-1
+- uniform: uniformly random bytes, which can't be compressed at all
+- binary: fixed size records (an increasing ID, a small number and a flag), like a table written out to disk
+
+Sizes can be given with K, M or G (1000, a million or a billion), from 1K up to 1G. The results are written out as JSON, so the results of two versions of the code can be compared, and slowdowns ('regressions') caught:
+
+    python wk9_huffman_benchmark.py --sizes 1K 1M 100M --output new.json
+    python wk9_huffman_benchmark.py --sizes 1K 1M 100M --compare old.json
+
+Decoding a 100 MB text message, for example, is measured with:
+
+    python wk9_huffman_benchmark.py --corpus text --sizes 100M --no-baselines
+
+With --compare, every throughput that has dropped by more than --tolerance (10% by default) since the old results is printed, and the exit status is 1. Steps that took less than --min-seconds (MIN_SECONDS) in either run are too quick to time reliably, and aren't compared.
+
+Each message is generated a block (BLOCK_SIZE characters) at a time. Unlike make_text(), the blocks are not repeats of each other, as lzma would spot the repeats and compress far better than it would on real data. Generating a 1 GB corpus this way takes a few minutes.
+"""
+
+# imports
+import argparse  # reads the command line
+import bz2  # baseline compressors to compare against
+import json  # the results are written out as JSON
+import lzma
+import platform  # recorded with the results, so runs on different machines aren't compared by mistake
+import random  # used to generate the test messages
+import struct  # packs the records of the binary corpus
+import sys  # results go to stdout, progress to stderr
+import tracemalloc  # measures peak memory
+import zlib
+
+from time_checking_funcs import timetaken
+from wk9_huffman import Huffman_decoder, Huffman_encoding_maker, count_symbols, is_binary, make_frame
+
+# letters used in the test message, most common first
+LETTERS = "etaoinshrdlucmfwypvbgkjqxz ETAOINSHRDLU,.;:!?'0123456789\n"
+
+# number of characters (or bytes) make_corpus() generates at a time, and the size of the block make_text() repeats
+BLOCK_SIZE = 1 << 20
+
+MB = 1000000
+
+# kinds of corpus, and the sizes used if none are given
+CORPORA = ("text", "skewed", "uniform", "binary")
+DEFAULT_SIZES = ("1K", "1M", "10M")
+
+# what a size ending in each letter is multiplied by
+SIZE_SUFFIXES = {"K": 1000, "M": MB, "G": 1000 * MB}
+
+# layout of a record in the binary corpus: ID (4 bytes), small number (2 bytes), flag (1 byte), padding (1 byte)
+RECORD = struct.Struct("<IHBx")
+
+# the baseline compressors, as (compress, decompress) pairs
+BASELINES = {
+    "zlib": (zlib.compress, zlib.decompress),
+    "bz2": (bz2.compress, bz2.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+}
+
+# how many times each step is timed (the quickest time is kept)
+REPEAT = 3
+
+# how far a throughput can drop before --compare reports it
+TOLERANCE = 0.10
+
+# steps quicker than this (in either run) aren't compared by --compare, as their times are mostly noise
+MIN_SECONDS = 0.01
+
+
+def make_text(size, seed=0):
+    """
+    Returns a message of 'size' characters, made from a repeated block of weighted random letters.
+
+    This is quicker to make than make_corpus("text", size), but the repeats flatter lzma, so it is only used where the baseline compressors aren't run (wk9_huffman_parallel's benchmark).
+    """
+    generator = random.Random(seed)
+    weights = range(len(LETTERS), 0, -1)
+    block = "".join(generator.choices(LETTERS, weights=weights, k=min(size, BLOCK_SIZE)))
+    repeats, remainder = divmod(size, len(block))
+    return block * repeats + block[:remainder]
+
+
+def text_block(generator, size):
+    weights = range(len(LETTERS), 0, -1)
+    return "".join(generator.choices(LETTERS, weights=weights, k=size))
+
+
+def skewed_block(generator, size):
+    weights = [0.8 ** value for value in range(256)]
+    return bytes(generator.choices(range(256), weights=weights, k=size))
+
+
+def uniform_block(generator, size):
+    return generator.randbytes(size)
+
+
+def binary_block(generator, size):
+    # each block numbers its records upwards from a random starting ID
+    first = generator.getrandbits(20)
+    records = b"".join(
+        RECORD.pack(first + record, generator.randrange(1000), generator.random() < 0.1)
+        for record in range(-(-size // RECORD.size)))
+    return records[:size]
+
+
+# function that makes one block of each kind of corpus
+BLOCK_MAKERS = {
+    "text": text_block,
+    "skewed": skewed_block,
+    "uniform": uniform_block,
+    "binary": binary_block,
+}
+
+
+def make_corpus(kind, size, seed=0):
+    """
+    Returns a message of 'size' characters (for text) or bytes (for everything else) of the given kind.
+
+    The message is made BLOCK_SIZE at a time, with every block different, so the compressors can't find long repeats that real data wouldn't have.
+    """
+    generator = random.Random(seed)
+    make_block = BLOCK_MAKERS[kind]
+    blocks = [make_block(generator, min(BLOCK_SIZE, size - start)) for start in range(0, size, BLOCK_SIZE)]
+    return ("" if kind == "text" else b"").join(blocks)
+
+
+def parse_size(size):
+    """Turns a size like '10M' into a number of characters (10000000). Raises ValueError for anything else."""
+    size = size.strip().upper()
+    multiplier = SIZE_SUFFIXES.get(size[-1:], 1)
+    if size[-1:] in SIZE_SUFFIXES:
+        size = size[:-1]
+    return int(float(size) * multiplier)
+
+
+def measure(func, arg, repeat=1):
+    """
+    Calls func(arg) 'repeat' times, returning what it returned and the quickest time it took, in seconds.
+
+    The quickest time is the one least disturbed by whatever else the machine was doing, which matters most for small messages.
+    """
+    holder = []
+    seconds = min(timetaken(lambda value: holder.append(func(value)), arg) for _ in range(repeat))
+    return holder.pop(), seconds
+
+
+def peak_memory(func, arg):
+    """Calls func(arg) with tracemalloc running, returning what it returned and the most memory allocated at once, in bytes."""
+    tracemalloc.start()
+    try:
+        result = func(arg)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+def throughput(size, seconds):
+    """MB of original message per second. A step too quick to time gives None, rather than dividing by 0."""
+    return size / seconds / MB if seconds > 0 else None
+
+
+def benchmark_huffman(message, memory=True, repeat=REPEAT):
+    """
+    Builds, encodes and decodes 'message' with wk9_huffman, checking the decoded message matches the original.
+
+    Building is timed on its own by giving Huffman_encoding_maker only the counts, and then calling encode() separately. Making the decoder (which builds its main table) is timed separately too, and the message is decoded once, untimed, before decoding is timed, so the decoder's other rows are already built (see wk9_huffman.Huffman_decoder). Decoding then measures only the table look-ups, which is what a long message spends its time on. Returns a dictionary of results.
+    """
+    size = len(message)
+    binary = is_binary(message)
+
+    def build(text):
+        return Huffman_encoding_maker(counts=count_symbols(text), binary=binary)
+
+    maker, build_time = measure(build, message, repeat)
+    encoded, encode_time = measure(maker.encode, message, repeat)
+    decoder, decoder_time = measure(lambda table: Huffman_decoder(table, binary), maker.encoding_table, repeat)
+    decoder.decode(encoded, maker.bit_length)
+    decoded, decode_time = measure(lambda data: decoder.decode(data, maker.bit_length), encoded, repeat)
+
+    if decoded != message:
+        raise AssertionError("decoded message does not match the original")
+    del decoded
+
+    result = {
+        "compressed_bytes": len(make_frame(maker.code_lengths, maker.bit_length, encoded, binary)),
+        "payload_bytes": len(encoded),
+        "unique_characters": len(maker.code_lengths),
+        "build_seconds": build_time,
+        "build_mb_per_second": throughput(size, build_time),
+        "encode_seconds": encode_time,
+        "encode_mb_per_second": throughput(size, encode_time),
+        "decoder_seconds": decoder_time,
+        "decode_seconds": decode_time,
+        "decode_mb_per_second": throughput(size, decode_time),
+    }
+
+    # the memory run repeats each step, this time with tracemalloc running
+    if memory:
+        maker, result["build_peak_bytes"] = peak_memory(build, message)
+        encoded, result["encode_peak_bytes"] = peak_memory(maker.encode, message)
+        decoder = Huffman_decoder(maker.encoding_table, binary)
+        decoded, result["decode_peak_bytes"] = peak_memory(lambda data: decoder.decode(data, maker.bit_length), encoded)
+
+    result["ratio"] = result["compressed_bytes"] / size if size else None
+    return result
+
+
+def benchmark_baseline(name, message, repeat=REPEAT):
+    """Compresses and decompresses 'message' with one of the BASELINES, returning its compressed size and speeds."""
+    compress, decompress = BASELINES[name]
+
+    # the baselines only work on bytes, so text is measured as UTF-8
+    data = message.encode("utf-8") if isinstance(message, str) else message
+
+    compressed, compress_time = measure(compress, data, repeat)
+    decompressed, decompress_time = measure(decompress, compressed, repeat)
+    if decompressed != data:
+        raise AssertionError(f"{name} did not decompress to the original")
+
+    return {
+        "compressed_bytes": len(compressed),
+        "ratio": len(compressed) / len(data) if data else None,
+        "encode_seconds": compress_time,
+        "encode_mb_per_second": throughput(len(data), compress_time),
+        "decode_seconds": decompress_time,
+        "decode_mb_per_second": throughput(len(data), decompress_time),
+    }
+
+
+def run_benchmarks(corpora=CORPORA, sizes=DEFAULT_SIZES, memory=True, baselines=True, repeat=REPEAT, log=None):
+    """
+    Runs every benchmark for every corpus and size, returning the results as a dictionary that can be written out as JSON.
+
+    'sizes' can be numbers or strings like '10M'. If 'log' is a file (such as sys.stderr), a line is written to it as each benchmark finishes.
+    """
+    results = []
+    for kind in corpora:
+        for size in sizes:
+            size = parse_size(size) if isinstance(size, str) else size
+            message = make_corpus(kind, size)
+
+            entry = {"corpus": kind, "size": size, "huffman": benchmark_huffman(message, memory, repeat)}
+            if baselines:
+                for name in BASELINES:
+                    entry[name] = benchmark_baseline(name, message, repeat)
+            results.append(entry)
+
+            if log is not None:
+                huffman = entry["huffman"]
+                print(
+                    f"{kind:8} {size:>12}: ratio {huffman['ratio'] or 0:.3f}, "
+                    f"encode {huffman['encode_mb_per_second'] or 0:.3g} MB/s, "
+                    f"decode {huffman['decode_mb_per_second'] or 0:.3g} MB/s",
+                    file=log)
+
+            del message
+
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def find_regressions(old, new, tolerance=TOLERANCE, min_seconds=MIN_SECONDS):
+    """
+    Compares two sets of results made by run_benchmarks(), returning a list of messages, one for every throughput that has fallen by more than 'tolerance' (a fraction), and every compressed size that has grown.
+
+    Only corpora and sizes that appear in both sets are compared. A throughput is only compared if its step took at least min_seconds in both runs: a step that takes a few microseconds can easily vary by more than the tolerance from one run to the next, so a 1K corpus would fail the comparison on noise alone. Compressed sizes don't vary from run to run, so they are always compared.
+    """
+    old_results = {(entry["corpus"], entry["size"]): entry for entry in old["results"]}
+    regressions = []
+
+    for entry in new["results"]:
+        previous = old_results.get((entry["corpus"], entry["size"]))
+        if previous is None:
+            continue
+        name = f"{entry['corpus']} {entry['size']}"
+
+        for key, value in entry["huffman"].items():
+            before = previous["huffman"].get(key)
+            if value is None or before is None:
+                continue
+            if key.endswith("_mb_per_second") and value < before * (1 - tolerance):
+                step = key[:-len("_mb_per_second")]
+                if min(entry["huffman"].get(f"{step}_seconds", 0), previous["huffman"].get(f"{step}_seconds", 0)) < min_seconds:
+                    continue
+                regressions.append(
+                    f"{name}: {key} fell from {before:.4g} to {value:.4g} ({value / before - 1:+.1%})")
+            if key == "compressed_bytes" and value > before:
+                regressions.append(f"{name}: compressed_bytes grew from {before} to {value}")
+
+    return regressions
+
+
+def main(arguments=None):
+    """Command line entry point. Returns the exit status: 1 if --compare found a regression, otherwise 0."""
+    parser = argparse.ArgumentParser(description="Benchmark wk9_huffman against zlib, bz2 and lzma.")
+    parser.add_argument("--corpus", action="append", choices=CORPORA, help="kind of corpus (can be repeated; default: all)")
+    parser.add_argument("--sizes", nargs="+", default=list(DEFAULT_SIZES), help="sizes such as 1K, 10M or 1G")
+    parser.add_argument("--output", help="file to write the JSON results to (default: print them)")
+    parser.add_argument("--compare", help="JSON results from an earlier run to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="fraction a throughput can fall before it counts as a regression")
+    parser.add_argument("--min-seconds", type=float, default=MIN_SECONDS, help="steps quicker than this aren't compared")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="times each step is timed; the quickest is kept")
+    parser.add_argument("--no-memory", action="store_true", help="skip measuring peak memory")
+    parser.add_argument("--no-baselines", action="store_true", help="skip zlib, bz2 and lzma")
+    options = parser.parse_args(arguments)
+
+    results = run_benchmarks(
+        options.corpus or CORPORA, options.sizes,
+        memory=not options.no_memory, baselines=not options.no_baselines, repeat=options.repeat, log=sys.stderr)
+
+    if options.output:
+        with open(options.output, "w") as output:
+            json.dump(results, output, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if options.compare:
+        with open(options.compare) as previous:
+            regressions = find_regressions(json.load(previous), results, options.tolerance, options.min_seconds)
+        for regression in regressions:
+            print(f"regression: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""
+Shared, pre-trained Huffman codebooks, for compressing lots of short messages.
+
+Huffman_encoding_maker builds a new tree for every message, and a frame has to carry its own code table. For a message of a few dozen characters, that costs more than the compression saves. Instead, a Huffman_codebook is trained once on a sample of typical messages, and then used to encode and decode any number of messages. Each encoded message only has to carry its own length, and the codebook's ID is agreed once per batch.
+
+A codebook's ID is a hash of its code table, so two processes that train on the same sample get the same ID, and a codebook can be stored or sent as a few hundred bytes (see to_bytes() and from_bytes()).
+
+Codebook_cache keeps the most recently used codebooks, up to a fixed number, and throws away the least recently used one when it is full (an 'LRU' cache). If a loader function is given, it is called to fetch a codebook the cache doesn't hold.
+
+Each encoded message is laid out as its bit length (as a variable length integer: 7 bits per byte, with the top bit set on every byte but the last) followed by the encoded bits. A 100 character message needs 1 or 2 bytes of length.
+"""
+
+# imports
+import hashlib  # used to make a codebook's ID from its code table
+from collections import Counter, OrderedDict  # counting the sample, and the order the cache's codebooks were used in
+
+from wk9_huffman import (
+    Huffman_decoder,
+    Huffman_encoding_maker,
+    count_symbols,
+    is_binary,
+    make_frame,
+    read_frame,
+)
+
+# number of codebooks kept by a Codebook_cache, unless told otherwise
+CACHE_SIZE = 64
+
+
+def write_length(length):
+    """Returns 'length' as a variable length integer: 7 bits per byte, least significant first, with the top bit set on every byte but the last."""
+    encoded = bytearray()
+    while length > 0x7F:
+        encoded.append((length & 0x7F) | 0x80)
+        length >>= 7
+    encoded.append(length)
+    return bytes(encoded)
+
+
+def read_length(data):
+    """Reads a variable length integer from the start of 'data'. Returns the integer and how many bytes it took up."""
+    length = 0
+    for position, byte in enumerate(data):
+        length |= (byte & 0x7F) << (7 * position)
+        if not byte & 0x80:
+            return length, position + 1
+    raise ValueError("encoded message is truncated")
+
+
+class Huffman_codebook:
+    """
+    A fixed set of Huffman codes, trained on a sample of messages, that can encode and decode any message made of characters it knows.
+
+    The encoding is done by a Huffman_encoding_maker built from the sample's counts, and decoding by a single Huffman_decoder, so the decoder's look-up table is shared by every message decoded with this codebook.
+    """
+
+    def __init__(self, code_lengths, binary=False):
+        """
+        Makes a codebook from a dictionary of character: code length. Use train() to make one from a sample, or from_bytes() to load one.
+        """
+        self.binary = binary
+        self.code_lengths = code_lengths
+
+        # Huffman_encoding_maker can be built from counts alone. Giving each character a count
+        # of 2 ** (longest - length) rebuilds the same code lengths, and so the same canonical codes.
+        # That only works for a complete set of codes, which Huffman's algorithm (and package-merge) always make.
+        longest = max(code_lengths.values(), default=0)
+        counts = {character: 1 << (longest - length) for character, length in code_lengths.items()}
+        self.maker = Huffman_encoding_maker(counts=counts, binary=binary)
+        if self.maker.code_lengths != code_lengths:
+            raise ValueError("code lengths do not make a complete set of Huffman codes")
+        self.encoding_table = self.maker.encoding_table
+
+        self.decoder = Huffman_decoder(self.encoding_table, binary)
+        self.id = hashlib.blake2b(self.to_bytes(), digest_size=8).hexdigest()
+
+    @classmethod
+    def train(cls, sample, alphabet=None, max_code_length=None):
+        """
+        Trains a codebook on 'sample': a message, or a list (or any iterable) of messages, all text or all bytes.
+
+        Characters that aren't in the sample can't be encoded. 'alphabet' adds extra characters (each counted once) so that they can be. A codebook trained on bytes always includes all 256 byte values, so any bytes message can be encoded with it.
+        """
+        if isinstance(sample, str) or is_binary(sample):
+            sample = [sample]
+
+        counts = Counter()
+        binary = False
+        for message in sample:
+            binary = is_binary(message)
+            counts.update(count_symbols(message))
+
+        if binary:
+            alphabet = range(256) if alphabet is None else alphabet
+        for character in alphabet or ():
+            counts[character] += 1
+
+        maker = Huffman_encoding_maker(counts=dict(counts), binary=binary, max_code_length=max_code_length)
+        return cls(maker.code_lengths, binary)
+
+    def to_bytes(self):
+        """Returns the codebook as bytes: a frame header (see wk9_huffman.make_frame()) with an empty message."""
+        return make_frame(self.code_lengths, 0, b"", self.binary)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Loads a codebook saved with to_bytes()."""
+        encoding_table, bit_length, binary, payload = read_frame(data)
+        return cls({character: len(code) for character, code in encoding_table.items()}, binary)
+
+    def encode(self, message):
+        """Encodes one message. Raises ValueError if the message has a character the codebook doesn't know. Nothing is stored on the codebook, so one codebook can encode from many threads at once."""
+        try:
+            encoded, bit_length = self.maker.encode_with_length(message)
+        except KeyError as error:
+            raise ValueError(f"character {error.args[0]!r} is not in codebook {self.id}") from None
+        return write_length(bit_length) + encoded
+
+    def decode(self, encoded):
+        """Decodes one message made by encode()."""
+        bit_length, start = read_length(encoded)
+        return self.decoder.decode(memoryview(encoded)[start:], bit_length)
+
+    def encode_many(self, messages):
+        """Encodes each message in 'messages', returning a list of the encoded messages."""
+        return [self.encode(message) for message in messages]
+
+    def decode_many(self, encoded_messages):
+        """Decodes each message in 'encoded_messages', returning a list of the decoded messages."""
+        return [self.decode(encoded) for encoded in encoded_messages]
+
+
+class Codebook_cache:
+    """
+    Holds up to 'size' codebooks, keyed by their IDs, dropping the least recently used one when a new one is added to a full cache.
+
+    The codebooks are kept in an OrderedDict in the order they were last used, so finding, refreshing and dropping a codebook are all O(1).
+
+    'loader', if given, is called with an ID the cache doesn't hold, and should return the codebook (for example by reading it from disk with Huffman_codebook.from_bytes()), or None.
+    """
+
+    def __init__(self, size=CACHE_SIZE, loader=None):
+        self.size = size
+        self.loader = loader
+        self.codebooks = OrderedDict()
+
+        # how often get() found the codebook in the cache, and how often it didn't
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.codebooks)
+
+    def __contains__(self, codebook_id):
+        return codebook_id in self.codebooks
+
+    def add(self, codebook):
+        """Adds a codebook (or marks it as just used, if it is already held) and returns its ID."""
+        self.codebooks[codebook.id] = codebook
+        self.codebooks.move_to_end(codebook.id)
+        while len(self.codebooks) > self.size:
+            self.codebooks.popitem(last=False)
+        return codebook.id
+
+    def train(self, sample, alphabet=None, max_code_length=None):
+        """Trains a codebook (see Huffman_codebook.train()), adds it to the cache and returns its ID."""
+        return self.add(Huffman_codebook.train(sample, alphabet, max_code_length))
+
+    def get(self, codebook_id):
+        """Returns the codebook with this ID. Raises KeyError if it isn't held and can't be loaded."""
+        codebook = self.codebooks.get(codebook_id)
+        if codebook is not None:
+            self.hits += 1
+            self.codebooks.move_to_end(codebook_id)
+            return codebook
+
+        self.misses += 1
+        if self.loader is not None:
+            codebook = self.loader(codebook_id)
+        if codebook is None:
+            raise KeyError(f"no codebook with ID {codebook_id}")
+        self.add(codebook)
+        return codebook
+
+    def encode_many(self, codebook_id, messages):
+        """Encodes a batch of messages with one codebook. The codebook is looked up once for the whole batch."""
+        return self.get(codebook_id).encode_many(messages)
+
+    def decode_many(self, codebook_id, encoded_messages):
+        """Decodes a batch of messages with one codebook. The codebook is looked up once for the whole batch."""
+        return self.get(codebook_id).decode_many(encoded_messages)
+
+
+if __name__ == "__main__":
+    ''' Compares a shared codebook with building a tree for each message, on a batch of short messages '''
+
+    import random
+
+    from time_checking_funcs import timetaken
+
+    words = "the a of to and in is it you that he was for on are with as his they be at one have this from".split()
+    generator = random.Random(0)
+    messages = [" ".join(generator.choices(words, k=generator.randint(5, 20))) for _ in range(20000)]
+
+    cache = Codebook_cache()
+    codebook_id = cache.train(messages[:1000])
+
+    results = []
+    shared_time = timetaken(lambda batch: results.append(cache.encode_many(codebook_id, batch)), messages)
+    encoded = results.pop()
+    decode_time = timetaken(lambda batch: results.append(cache.decode_many(codebook_id, batch)), encoded)
+    assert results.pop() == messages
+
+    per_message_time = timetaken(lambda batch: results.append([Huffman_encoding_maker(m).get_frame() for m in batch]), messages)
+    frames = results.pop()
+
+    original = sum(len(message.encode("utf-8")) for message in messages)
+    print(f"{len(messages)} messages, {original} bytes in total")
+    print(f"shared codebook {codebook_id}: {sum(map(len, encoded))} bytes, encoded in {shared_time:.2f} s, decoded in {decode_time:.2f} s")
+    print(f"a tree per message: {sum(map(len, frames))} bytes, encoded in {per_message_time:.2f} s")
+
+    # a character the codebook doesn't know is refused, however long the message (long messages take a faster path)
+    for message in ("the z", "the " * 20000 + "z"):
+        try:
+            cache.encode_many(codebook_id, [message])
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"a {len(message)} character message with an unknown character was encoded")
+    print("messages with a character the codebook doesn't know are refused")
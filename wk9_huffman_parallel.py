@@ -0,0 +1,150 @@
+"""
+Compresses a message on several processor cores at once, using the Huffman_encoding_maker from wk9_huffman.
+
+The message is split into blocks of BLOCK_SIZE characters. Each block is compressed on its own, with its own counts, tree and code table, by a worker process in a ProcessPoolExecutor. Because the blocks don't depend on each other, they can also be decompressed in parallel.
+
+The compressed blocks are put together into a multi-block container, laid out as follows (all numbers big-endian):
+
+- BLOCKS_MAGIC (4 bytes) and BLOCKS_VERSION (1 byte)
+- flags (1 byte): FLAG_BYTES if the message is bytes rather than text
+- the number of blocks (4 bytes)
+- an index, with one entry per block: where the block's frame starts (8 bytes, counted from the start of the container), how long the frame is (8 bytes) and how many characters it decodes to (8 bytes)
+- the blocks' frames, one after the other. Each is a normal frame as made by Huffman_encoding_maker.get_frame(), so any one of them can be decoded with wk9_huffman.decode().
+
+Giving each block its own code table costs a few hundred bytes per block, but it also means each block's codes fit that block's own text, which can make up for it on messages whose content changes as they go along.
+
+Running the file on its own prints how long compression and decompression take with 1, 2, 4 and 8 workers.
+"""
+
+# imports
+import struct  # used to pack the container's header and index
+import sys  # used to read the size of the test message from the command line
+from concurrent.futures import ProcessPoolExecutor  # runs the workers
+
+from wk9_huffman import FLAG_BYTES, Huffman_encoding_maker, decode, is_binary
+
+# first bytes of every container, and the version of the layout
+BLOCKS_MAGIC = b"HUFB"
+BLOCKS_VERSION = 1
+
+# number of characters in each block
+BLOCK_SIZE = 1 << 20
+
+# layout of the header, and of each entry in the index
+HEADER = struct.Struct(">4sBBI")
+INDEX_ENTRY = struct.Struct(">QQQ")
+
+
+def compress_block(block):
+    """Compresses one block into a frame. Runs in a worker process, so it has to be a module level function that can be pickled."""
+    return Huffman_encoding_maker(block).get_frame()
+
+
+def split_into_blocks(message, block_size):
+    """
+    Returns a list of the blocks of 'message', each 'block_size' characters long (apart from the last).
+
+    Blocks of a bytes-like message are copied into bytes objects, as memoryviews can't be sent to another process.
+    """
+    if is_binary(message):
+        view = memoryview(message).cast("B")
+        return [bytes(view[start:start + block_size]) for start in range(0, len(view), block_size)]
+    return [message[start:start + block_size] for start in range(0, len(message), block_size)]
+
+
+def map_over_blocks(function, blocks, workers):
+    """
+    Calls 'function' on each block and returns a list of the results, in the same order.
+
+    With one worker (or one block) everything is done in this process, which avoids the cost of starting a pool and sending the blocks to it. Otherwise the blocks are shared out between 'workers' processes. None means one process per processor core.
+    """
+    if workers == 1 or len(blocks) <= 1:
+        return [function(block) for block in blocks]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(function, blocks))
+
+
+def compress_blocks(message, block_size=BLOCK_SIZE, workers=None):
+    """
+    Compresses 'message' into a multi-block container (see the top of this file), compressing the blocks in parallel.
+
+    Complexity is still O(n) in total, but the work is shared between the workers, so with w workers and enough blocks the time taken falls towards O(n/w).
+    """
+    blocks = split_into_blocks(message, block_size)
+    frames = map_over_blocks(compress_block, blocks, workers)
+
+    # the frames start straight after the header and the index
+    offset = HEADER.size + INDEX_ENTRY.size * len(frames)
+    index = bytearray()
+    for block, frame in zip(blocks, frames):
+        index += INDEX_ENTRY.pack(offset, len(frame), len(block))
+        offset += len(frame)
+
+    flags = FLAG_BYTES if is_binary(message) else 0
+    return b"".join([HEADER.pack(BLOCKS_MAGIC, BLOCKS_VERSION, flags, len(frames)), bytes(index)] + frames)
+
+
+def read_block_index(buffer):
+    """
+    Reads the header and index of a multi-block container.
+
+    Returns whether the message is bytes, and a list with one (offset, length, characters) tuple for each block. Raises ValueError if the buffer isn't a valid container.
+    """
+    if len(buffer) < HEADER.size:
+        raise ValueError("buffer is not a Huffman block container")
+
+    magic, version, flags, count = HEADER.unpack_from(buffer)
+    if magic != BLOCKS_MAGIC:
+        raise ValueError("buffer is not a Huffman block container")
+    if version != BLOCKS_VERSION:
+        raise ValueError(f"unsupported Huffman block container version {version}")
+    if len(buffer) < HEADER.size + INDEX_ENTRY.size * count:
+        raise ValueError("Huffman block container is truncated")
+
+    index = [
+        INDEX_ENTRY.unpack_from(buffer, HEADER.size + INDEX_ENTRY.size * block)
+        for block in range(count)]
+
+    for offset, length, characters in index:
+        if offset + length > len(buffer):
+            raise ValueError("Huffman block container is truncated")
+
+    return bool(flags & FLAG_BYTES), index
+
+
+def decompress_blocks(buffer, workers=None):
+    """
+    Decompresses a multi-block container made by compress_blocks(), decoding the blocks in parallel.
+
+    Each worker is sent only the bytes of its own block's frame.
+    """
+    binary, index = read_block_index(buffer)
+    frames = [bytes(buffer[offset:offset + length]) for offset, length, characters in index]
+    return (b"" if binary else "").join(map_over_blocks(decode, frames, workers))
+
+
+if __name__ == "__main__":
+    ''' Measures how compression and decompression scale with the number of workers. '''
+
+    from os import cpu_count  # only used to report the number of cores
+
+    from time_checking_funcs import timetaken
+    from wk9_huffman_benchmark import make_text
+
+    size = int(float(sys.argv[1]) * 1000000) if len(sys.argv) > 1 else 32000000
+    message = make_text(size)
+    print(f"message: {size / 1000000:.0f} MB, blocks of {BLOCK_SIZE} characters, {cpu_count()} cores available")
+
+    for workers in (1, 2, 4, 8):
+        results = []
+        compress_time = timetaken(lambda text: results.append(compress_blocks(text, workers=workers)), message)
+        container = results.pop()
+        decompress_time = timetaken(lambda data: results.append(decompress_blocks(data, workers=workers)), container)
+
+        if results.pop() != message:
+            raise AssertionError("decompressed message does not match the original")
+
+        print(
+            f"{workers} worker(s): compress {compress_time:.2f} s ({size / compress_time / 1000000:.1f} MB/s), "
+            f"decompress {decompress_time:.2f} s ({size / decompress_time / 1000000:.1f} MB/s)")
@@ -0,0 +1,347 @@
+"""
+Huffman compression as a service: a 'sidecar' process that other processes on the same machine send payloads to over a Unix socket, and get frames (see wk9_huffman.make_frame()) back from.
+
+The server is written with asyncio, so one process can serve many connections at once. Building a Huffman tree and encoding a message is CPU-heavy pure Python, and would stop the event loop from answering anyone else while it ran, so payloads over INLINE_LIMIT bytes are sent to a ProcessPoolExecutor. Small payloads are encoded straight away, as sending them to another process would take longer than encoding them.
+
+Every message, in both directions, is length-prefixed (all numbers big-endian):
+
+- a request is an operation (1 byte: COMPRESS or DECOMPRESS), the payload's length (4 bytes) and the payload
+- a response is a status (1 byte: OK or ERROR), the body's length (4 bytes) and the body: the frame, the decompressed bytes, or an error message in UTF-8
+
+Requests can be 'pipelined': a client can send many requests without waiting for the answers. The server starts work on each request as soon as it is read, so they are worked on in parallel, but it sends the responses back in the same order as the requests arrived. That means neither side needs request IDs; the n'th response is always the answer to the n'th request. At most PIPELINE_DEPTH requests per connection are worked on at once, after which the server stops reading from that connection until some are answered.
+
+Payloads are compressed as bytes. A text frame sent to DECOMPRESS is returned as UTF-8.
+
+Run the server with:
+
+    python wk9_huffman_service.py /tmp/huffman.sock
+
+and see wk9_huffman_service_load.py for a load generator.
+"""
+
+# imports
+import argparse  # reads the command line
+import asyncio  # runs the server and client
+import multiprocessing  # chooses how the worker processes are started
+import struct  # packs the headers of requests and responses
+import sys  # used to exit with the right status
+from collections import deque  # the client's requests still waiting for a response, oldest first
+from concurrent.futures import ProcessPoolExecutor  # runs the CPU-heavy encoding in other processes
+from functools import partial  # used to hand the right function to the executor
+
+from wk9_huffman import Huffman_encoding_maker, decode
+
+# operations a request can ask for
+COMPRESS = 1
+DECOMPRESS = 2
+
+# status of a response
+OK = 0
+ERROR = 1
+
+# layout of the header of a request (operation, length) and of a response (status, length)
+HEADER = struct.Struct(">BI")
+
+# largest payload the server will accept, in bytes
+MAX_PAYLOAD = 1 << 26
+
+# largest response body a header can give the length of. A frame can be a little bigger than its payload, and
+# decompressing can give far more bytes than the frame has, so responses aren't held to MAX_PAYLOAD.
+MAX_RESPONSE = (1 << 32) - 1
+
+# payloads up to this size are handled on the event loop itself, rather than sent to the executor
+INLINE_LIMIT = 1 << 10
+
+# number of requests per connection worked on at once
+PIPELINE_DEPTH = 64
+
+
+class Protocol_error(Exception):
+    """Raised when the other side sends something that doesn't follow the protocol. The connection can't be used after this."""
+
+
+def compress(payload):
+    """Compresses a payload (bytes) into a frame. Runs in a worker process, so it has to be a module level function that can be pickled."""
+    return Huffman_encoding_maker(payload).get_frame()
+
+
+def decompress(frame):
+    """Decompresses a frame back into bytes. A text frame is returned as UTF-8."""
+    message = decode(frame)
+    return message.encode("utf-8") if isinstance(message, str) else message
+
+
+# function for each operation
+OPERATIONS = {COMPRESS: compress, DECOMPRESS: decompress}
+
+
+async def read_message(reader, limit=MAX_PAYLOAD):
+    """
+    Reads one length-prefixed message, returning its first byte (the operation or status) and its body.
+
+    'limit' is the longest body accepted, or None for no limit. The server holds requests to MAX_PAYLOAD; the client reads responses with no limit, as a response to a payload near the limit can be longer than the payload.
+
+    Returns None if the connection was closed cleanly before the message began. Raises Protocol_error if it is closed part way through, or the body is too long.
+    """
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError as error:
+        if error.partial:
+            raise Protocol_error("connection closed part way through a header") from None
+        return None
+
+    kind, length = HEADER.unpack(header)
+    if limit is not None and length > limit:
+        raise Protocol_error(f"payload of {length} bytes is over the limit of {limit}")
+
+    try:
+        body = await reader.readexactly(length)
+    except asyncio.IncompleteReadError:
+        raise Protocol_error("connection closed part way through a payload") from None
+    return kind, body
+
+
+def write_message(writer, kind, body):
+    """Writes one length-prefixed message. Nothing is sent until the writer is drained."""
+    writer.write(HEADER.pack(kind, len(body)))
+    writer.write(body)
+
+
+class Huffman_server:
+    """
+    The compression service. Use start() to begin listening on a Unix socket, and close() to stop.
+
+    'workers' is the number of processes in the executor (None means one per processor core). 'inline_limit' is the largest payload handled on the event loop itself.
+
+    The workers are started by a 'forkserver', which imports the main script again, so a script that starts a server needs an if __name__ == "__main__": guard.
+    """
+
+    def __init__(self, path, workers=None, inline_limit=INLINE_LIMIT, pipeline_depth=PIPELINE_DEPTH):
+        self.path = path
+        self.workers = workers
+        self.inline_limit = inline_limit
+        self.pipeline_depth = pipeline_depth
+        self.executor = None
+        self.server = None
+
+        # the task serving each open connection, so close() can stop them
+        self.connections = set()
+
+        # how many requests have been answered, and how many of those were errors
+        self.requests = 0
+        self.errors = 0
+
+    async def start(self):
+        """Starts the executor and begins listening on the socket."""
+        # workers are started lazily, while connections are open. A forked worker would inherit every open
+        # connection's socket, and keep it open after the server closed it, so the client would never see the
+        # end of the connection. Workers started by a 'forkserver' don't inherit them.
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("forkserver"))
+        self.server = await asyncio.start_unix_server(self.handle_connection, path=self.path)
+
+    async def serve_forever(self):
+        """Starts the server (if it hasn't been already) and serves until cancelled."""
+        if self.server is None:
+            await self.start()
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self):
+        """Stops listening, closes every open connection (dropping the requests still being worked on), and shuts down the executor once its work is done."""
+        if self.server is not None:
+            self.server.close()
+            for connection in list(self.connections):
+                connection.cancel()
+            await asyncio.gather(*self.connections, return_exceptions=True)
+            await self.server.wait_closed()
+            self.server = None
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    async def run_operation(self, operation, payload):
+        """
+        Carries out one request, returning the (status, body) of its response.
+
+        Small payloads are handled here; anything larger is sent to the executor, so the event loop can carry on reading and answering other requests while it is worked on.
+        """
+        function = OPERATIONS.get(operation)
+        if function is None:
+            return ERROR, f"unknown operation {operation}".encode("utf-8")
+
+        try:
+            if len(payload) <= self.inline_limit:
+                body = function(payload)
+            else:
+                loop = asyncio.get_running_loop()
+                body = await loop.run_in_executor(self.executor, partial(function, payload))
+        except Exception as error:
+            return ERROR, f"{type(error).__name__}: {error}".encode("utf-8")
+
+        if len(body) > MAX_RESPONSE:
+            return ERROR, f"response of {len(body)} bytes is over the limit of {MAX_RESPONSE}".encode("utf-8")
+        return OK, body
+
+    async def handle_connection(self, reader, writer):
+        """
+        Serves one connection.
+
+        Two tasks share the work: this one reads requests and starts work on each, putting it on a queue, and send_responses() takes them off the queue in order and writes back each answer when it is ready. The queue holds at most pipeline_depth requests, so a client that sends requests faster than they can be answered is made to wait.
+
+        If the server is closed while the connection is open, this task is cancelled. It then stops the sender and closes the connection, and returns rather than raising CancelledError, as asyncio would log a cancelled connection task as an error.
+        """
+        self.connections.add(asyncio.current_task())
+        pending = asyncio.Queue(maxsize=self.pipeline_depth)
+        sender = asyncio.create_task(self.send_responses(pending, writer))
+        closing = False
+
+        try:
+            while not sender.done():
+                request = await read_message(reader)
+                if request is None:
+                    break
+                await pending.put(asyncio.create_task(self.run_operation(*request)))
+        except (Protocol_error, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            closing = True
+        finally:
+            try:
+                # None tells the sender there will be nothing more (unless it has already stopped)
+                if closing:
+                    sender.cancel()
+                elif not sender.done():
+                    await pending.put(None)
+                await sender
+            except asyncio.CancelledError:
+                # cancelled while waiting for the last responses: stop sending them
+                sender.cancel()
+                await asyncio.wait([sender])
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, asyncio.CancelledError):
+                pass
+            self.connections.discard(asyncio.current_task())
+
+    async def send_responses(self, pending, writer):
+        """Writes back the response to each request on 'pending', in the order the requests arrived, until it is given None (or is cancelled)."""
+        try:
+            while True:
+                task = await pending.get()
+                if task is None:
+                    return
+
+                status, body = await task
+                self.requests += 1
+                self.errors += status != OK
+                write_message(writer, status, body)
+
+                # only wait for the data to be sent once there is nothing else ready to write
+                if pending.empty():
+                    await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            # the client has gone, or the server is closing; drop everything still waiting to be answered
+            while not pending.empty():
+                task = pending.get_nowait()
+                if task is not None:
+                    task.cancel()
+
+
+class Huffman_client:
+    """
+    A client for Huffman_server, over one connection.
+
+    compress() and decompress() can be called many times at once (from different tasks, or with asyncio.gather()), and the requests are pipelined over the connection. Each call's request is written straight away, and its future added to a queue; a single reader task hands each response to the oldest future still waiting, as responses arrive in the same order as the requests.
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.waiting = deque()
+        self.receiver = asyncio.create_task(self.receive_responses())
+
+    @classmethod
+    async def connect(cls, path):
+        """Connects to the server listening on the Unix socket at 'path'."""
+        reader, writer = await asyncio.open_unix_connection(path)
+        return cls(reader, writer)
+
+    async def receive_responses(self):
+        """Reads responses until the connection closes, handing each one to the oldest waiting request."""
+        error = ConnectionError("connection to the Huffman server closed")
+        try:
+            while True:
+                response = await read_message(self.reader, limit=None)
+                if response is None:
+                    break
+                status, body = response
+                future = self.waiting.popleft()
+                if future.cancelled():
+                    continue
+                if status == OK:
+                    future.set_result(body)
+                else:
+                    future.set_exception(RuntimeError(body.decode("utf-8")))
+        except (Protocol_error, ConnectionError) as reason:
+            error = ConnectionError(f"connection to the Huffman server failed: {reason}")
+        finally:
+            # anything still waiting will never get a response
+            while self.waiting:
+                future = self.waiting.popleft()
+                if not future.done():
+                    future.set_exception(error)
+
+    async def request(self, operation, payload):
+        """Sends one request and waits for its response. Raises RuntimeError if the server reports an error."""
+        if self.receiver.done():
+            raise ConnectionError("connection to the Huffman server is closed")
+        future = asyncio.get_running_loop().create_future()
+
+        # the request is written and its future queued with no await in between, so the order of the queue is the order of the requests
+        write_message(self.writer, operation, payload)
+        self.waiting.append(future)
+
+        await self.writer.drain()
+        return await future
+
+    async def compress(self, payload):
+        """Returns the frame for 'payload' (bytes)."""
+        return await self.request(COMPRESS, bytes(payload))
+
+    async def decompress(self, frame):
+        """Returns the bytes a frame decodes to."""
+        return await self.request(DECOMPRESS, bytes(frame))
+
+    async def close(self):
+        """Closes the connection, once every response still to come has arrived."""
+        if self.writer.can_write_eof():
+            self.writer.write_eof()
+        await self.receiver
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+def main(arguments=None):
+    """Command line entry point: runs the server until interrupted."""
+    parser = argparse.ArgumentParser(description="Serve Huffman compression over a Unix socket.")
+    parser.add_argument("path", help="path of the Unix socket to listen on")
+    parser.add_argument("--workers", type=int, help="number of worker processes (default: one per core)")
+    parser.add_argument("--inline-limit", type=int, default=INLINE_LIMIT, help="largest payload encoded without the worker processes")
+    options = parser.parse_args(arguments)
+
+    server = Huffman_server(options.path, options.workers, options.inline_limit)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+A load generator for wk9_huffman_service.
+
+It opens a number of connections to the service, and on each one keeps a fixed number of compress requests in flight (the 'pipeline depth') for a set number of seconds. Every request's latency, from sending it to getting its response, is recorded. At the end it reports the number of requests per second and the 50th and 99th percentile latencies (p50 and p99: half of the requests were quicker than p50, and 99 in every 100 were quicker than p99).
+
+Unless --socket is given, a server is started in this process, on a temporary socket, for the length of the run:
+
+    python wk9_huffman_service_load.py --connections 4 --depth 8 --size 4K --seconds 10
+
+The payloads are skewed bytes from wk9_huffman_benchmark.make_corpus(), and every tenth response is decompressed by the service and checked against what was sent.
+"""
+
+# imports
+import argparse  # reads the command line
+import asyncio  # runs the connections
+import json  # the report can be printed as JSON
+import os  # used to make the temporary socket's path
+import sys  # used to exit with the right status
+import tempfile  # a directory for the temporary socket
+import time  # measures latencies
+
+from wk9_huffman_benchmark import make_corpus, parse_size
+from wk9_huffman_service import Huffman_client, Huffman_server
+
+# every CHECK_EVERY'th response is decompressed and checked
+CHECK_EVERY = 10
+
+
+def percentile(ordered, fraction):
+    """Returns the value 'fraction' of the way along a sorted list (nearest rank), or None for an empty list."""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def keep_requests_in_flight(client, payload, deadline, latencies):
+    """Sends compress requests one after another until 'deadline', recording each one's latency. Several of these share a connection to make the pipeline."""
+    count = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        frame = await client.compress(payload)
+        latencies.append(time.perf_counter() - start)
+
+        count += 1
+        if count % CHECK_EVERY == 0 and await client.decompress(frame) != payload:
+            raise AssertionError("service did not decompress to the original payload")
+
+
+async def generate_load(path, connections, depth, payload, seconds):
+    """Runs the load against the service at 'path', returning a list of the latency of every request, in seconds."""
+    clients = [await Huffman_client.connect(path) for _ in range(connections)]
+    latencies = []
+    deadline = time.perf_counter() + seconds
+
+    try:
+        await asyncio.gather(*(
+            keep_requests_in_flight(client, payload, deadline, latencies)
+            for client in clients for _ in range(depth)))
+    finally:
+        for client in clients:
+            await client.close()
+
+    return latencies
+
+
+async def run(options):
+    """Starts a server (unless one was given), runs the load and returns the report as a dictionary."""
+    payload = make_corpus("skewed", parse_size(options.size))
+
+    server = None
+    with tempfile.TemporaryDirectory() as directory:
+        path = options.socket
+        if path is None:
+            path = os.path.join(directory, "huffman.sock")
+            server = Huffman_server(path, options.workers)
+            await server.start()
+
+        try:
+            start = time.perf_counter()
+            latencies = await generate_load(path, options.connections, options.depth, payload, options.seconds)
+            elapsed = time.perf_counter() - start
+        finally:
+            if server is not None:
+                await server.close()
+
+    latencies.sort()
+    return {
+        "connections": options.connections,
+        "depth": options.depth,
+        "payload_bytes": len(payload),
+        "requests": len(latencies),
+        "seconds": elapsed,
+        "requests_per_second": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000 if latencies else None,
+        "p99_ms": percentile(latencies, 0.99) * 1000 if latencies else None,
+    }
+
+
+def main(arguments=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Generate load against the Huffman compression service.")
+    parser.add_argument("--socket", help="socket of a running service (default: start one for the run)")
+    parser.add_argument("--workers", type=int, help="worker processes for the server started for the run")
+    parser.add_argument("--connections", type=int, default=4, help="number of connections")
+    parser.add_argument("--depth", type=int, default=8, help="requests kept in flight on each connection")
+    parser.add_argument("--size", default="4K", help="size of each payload, such as 512, 4K or 1M")
+    parser.add_argument("--seconds", type=float, default=10, help="how long to run for")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    options = parser.parse_args(arguments)
+
+    report = asyncio.run(run(options))
+
+    if options.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(
+            f"{report['requests']} requests of {report['payload_bytes']} bytes in {report['seconds']:.1f} s "
+            f"over {report['connections']} connection(s), {report['depth']} in flight on each")
+        print(f"{report['requests_per_second']:.1f} requests per second")
+        if report["requests"]:
+            print(f"latency p50 {report['p50_ms']:.2f} ms, p99 {report['p99_ms']:.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())